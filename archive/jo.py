@@ -5,8 +5,13 @@ import torch
 import time
 import altair as alt
 import re
+import os
+import sys
 from transformers import AutoTokenizer, AutoModelForCausalLM
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_client import ModelClient, SERVER_URL
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Model Loading with Timing
 # ─────────────────────────────────────────────────────────────────────────────
@@ -14,6 +19,8 @@ model_load_start = time.time()
 
 @st.cache_resource
 def load_model():
+    if SERVER_URL:
+        return None, None   # weights live in model_server.py
     tokenizer = AutoTokenizer.from_pretrained("defog/sqlcoder-7b-2")
     model = AutoModelForCausalLM.from_pretrained(
         "defog/sqlcoder-7b-2",
@@ -127,15 +134,18 @@ def apply_sql_fixes(sql):
 def nl_to_sql(nlq):
     prompt = prompt_template.format(question=nlq, schema=schema_text)
     start = time.time()
-    inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
-    outputs = model.generate(
-        **inputs,
-        max_new_tokens=256,
-        temperature=0.7,
-        top_p=0.9,
-        pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id,
-    )
-    raw = tokenizer.decode(outputs[0], skip_special_tokens=True)
+    if SERVER_URL:
+        raw = ModelClient(SERVER_URL, prompt_template, schema_text).generate(nlq)
+    else:
+        inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+        outputs = model.generate(
+            **inputs,
+            max_new_tokens=256,
+            temperature=0.7,
+            top_p=0.9,
+            pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id,
+        )
+        raw = tokenizer.decode(outputs[0], skip_special_tokens=True)
     sql = extract_sql_from_output(raw)
     sql = apply_sql_fixes(sql)
     st.session_state["sqlgen_time"] = time.time() - start
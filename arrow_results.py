@@ -0,0 +1,79 @@
+import pyarrow as pa
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Arrow-native Result Path: sqlite3 cursor → pyarrow.Table
+# ─────────────────────────────────────────────────────────────────────────────
+# pd.read_sql materialises every row as Python objects and then builds an
+# object-dtype frame for every text column; st.dataframe and Altair convert
+# that back to Arrow / JSON. Here rows are pulled in fetchmany() batches and
+# each column is turned straight into a typed Arrow array, so the grid, the
+# chart and the Parquet result cache all consume the same columnar buffers.
+# Reading itself is bound by sqlite3 building row tuples on either path; the
+# saving is in the conversions after it (bench/bench_arrow_results.py).
+#
+# SQLite columns are dynamically typed, so a column can change type between
+# batches (ints then floats, or a stray string). Chunks are unified at the
+# end: null-only chunks take the column type, mixed ints/floats become
+# float64, anything else falls back to strings.
+BATCH_ROWS = 8192
+
+
+def column_array(values):
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if v is None else str(v) for v in values], pa.string())
+
+
+def _unify(chunks):
+    types = {c.type for c in chunks if not pa.types.is_null(c.type)}
+    if not types:
+        return pa.chunked_array(chunks, pa.null())
+    if len(types) == 1:
+        target = types.pop()
+    elif all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+        target = pa.float64()
+    else:
+        target = pa.string()
+    return pa.chunked_array([c.cast(target) for c in chunks], target)
+
+
+def unique_names(names):
+    # Duplicate names (s.prop_id, p.prop_id) become prop_id, prop_id:1, ...,
+    # SQLite's own convention for the first few duplicates
+    seen, out = set(), []
+    for name in names:
+        candidate, n = name, 0
+        while candidate in seen:
+            n += 1
+            candidate = f"{name}:{n}"
+        seen.add(candidate)
+        out.append(candidate)
+    return out
+
+
+def read_arrow(sql, conn, batch_rows=BATCH_ROWS, params=()):
+    cur = conn.execute(sql, params)
+    try:
+        names = unique_names([d[0] for d in cur.description])
+        chunks = [[] for _ in names]
+        while True:
+            rows = cur.fetchmany(batch_rows)
+            if not rows:
+                break
+            for i, values in enumerate(zip(*rows)):
+                chunks[i].append(column_array(list(values)))
+    finally:
+        cur.close()
+    columns = [_unify(c) if c else pa.chunked_array([], pa.null()) for c in chunks]
+    return pa.table(columns, names=names)
+
+
+def numeric_columns(table):
+    return [f.name for f in table.schema
+            if pa.types.is_integer(f.type) or pa.types.is_floating(f.type) or pa.types.is_decimal(f.type)]
+
+
+def other_columns(table):
+    numeric = set(numeric_columns(table))
+    return [name for name in table.column_names if name not in numeric]
@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+
+from sqltext import (MODEL_NAME, MAX_NEW_TOKENS, split_prompt, extract_sql_from_output, apply_sql_fixes,
+                     sql_statement_complete)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Pluggable Inference Backends
+# ─────────────────────────────────────────────────────────────────────────────
+# Every backend yields a generator object with the SQLGenerator interface
+# (build_prompt / generate / stream / nl_to_sql / nl_to_sql_batch, per-call
+# token counts filled into an optional `stats` dict), so callers never branch.
+#
+#   hf       – transformers fp16, device_map="auto" (GPU servers)
+#   hf-int8  – transformers fp32 + torch dynamic int8 quantisation of Linear layers (CPU)
+#   gguf     – quantised GGUF model through llama-cpp-python (CPU)
+BACKEND = os.environ.get("SQLGEN_BACKEND", "hf")
+GGUF_PATH = os.environ.get("SQLGEN_GGUF_PATH", "models/sqlcoder-7b-2.Q4_K_M.gguf")
+GGUF_CTX = int(os.environ.get("SQLGEN_GGUF_CTX", "4096"))
+BACKENDS = ["hf", "hf-int8", "gguf"]
+
+# torch / transformers (and sqlgen, which needs them) are imported only by
+# the hf backends, so a GGUF-only install never needs them
+
+
+def load_int8_model():
+    import torch
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModelForCausalLM.from_pretrained(
+        MODEL_NAME,
+        torch_dtype=torch.float32,
+        low_cpu_mem_usage=True
+    )
+    model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return tokenizer, model
+
+
+def load_gguf_model(path=GGUF_PATH):
+    from llama_cpp import Llama
+    return Llama(model_path=path, n_ctx=GGUF_CTX, n_threads=os.cpu_count(), verbose=False)
+
+
+def load_model(backend=BACKEND):
+    if backend == "hf":
+        import sqlgen
+        return sqlgen.load_model()
+    if backend == "hf-int8":
+        return load_int8_model()
+    if backend == "gguf":
+        return load_gguf_model()
+    raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+
+
+def make_generator(backend, handle, prompt_template, schema_text, grammar=None):
+    # grammar: optional GBNF string from sql_grammar.build_sqlite_grammar()
+    if backend == "gguf":
+        return LlamaCppGenerator(handle, prompt_template, schema_text, grammar=grammar)
+    import sqlgen
+    tokenizer, model = handle
+    return sqlgen.SQLGenerator(tokenizer, model, prompt_template, schema_text, grammar=grammar)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# llama.cpp Generator
+# A Llama context is not thread-safe and mainui shares one across sessions,
+# so every eval / completion on it holds that context's lock. Generators for
+# different prompt prefixes (one per pruned table subset) also share the one
+# context and its single KV cache: the prefill below only survives until a
+# generator with another prefix decodes. llama.cpp then re-evaluates from the
+# first differing token, so output stays correct; only the prefill saving is
+# lost when sessions alternate between subsets.
+_llm_locks = {}
+
+
+def llm_lock(llm):
+    return _llm_locks.setdefault(id(llm), threading.Lock())
+
+
+class LlamaCppGenerator:
+    def __init__(self, llm, prompt_template, schema_text, grammar=None):
+        self.llm = llm
+        self.lock = llm_lock(llm)
+        self.grammar = None
+        if grammar is not None:
+            from llama_cpp import LlamaGrammar
+            self.grammar = LlamaGrammar.from_string(grammar, verbose=False)
+        self.prompt_prefix, self.prompt_suffix = split_prompt(prompt_template, schema_text)
+
+        # Prefill the static prefix; llama.cpp keeps the KV state and reuses
+        # the longest matching token prefix on every later completion
+        with self.lock:
+            self.llm.reset()
+            self.llm.eval(self.llm.tokenize(self.prompt_prefix.encode("utf-8")))
+
+    def build_prompt(self, nlq):
+        return self.prompt_prefix + self.prompt_suffix.format(question=nlq)
+
+    def stream(self, nlq, max_new_tokens=MAX_NEW_TOKENS, stats=None):
+        # The lock is held until the stream is exhausted or closed (an
+        # abandoned stream is closed when the caller's frame unwinds)
+        text, n_tokens = "", 0
+        with self.lock:
+            completion = self.llm.create_completion(
+                self.build_prompt(nlq),
+                max_tokens=max_new_tokens,
+                temperature=0.7,
+                top_p=0.9,
+                grammar=self.grammar,
+                stream=True,
+            )
+            try:
+                for chunk in completion:
+                    piece = chunk["choices"][0]["text"]
+                    n_tokens += 1
+                    text += piece
+                    yield piece
+                    if sql_statement_complete(text):
+                        break   # closing the stream stops llama.cpp decoding
+            finally:
+                completion.close()
+        if stats is not None:
+            stats.update(new_tokens=n_tokens, tokens_saved=max_new_tokens - n_tokens)
+
+    def generate(self, nlq, max_new_tokens=MAX_NEW_TOKENS, stats=None):
+        return self.build_prompt(nlq) + "".join(self.stream(nlq, max_new_tokens=max_new_tokens, stats=stats))
+
+    def nl_to_sql(self, nlq, max_new_tokens=MAX_NEW_TOKENS, stats=None):
+        raw = self.generate(nlq, max_new_tokens=max_new_tokens, stats=stats)
+        return raw, apply_sql_fixes(extract_sql_from_output(raw))
+
+    def nl_to_sql_batch(self, questions, max_batch_size=1, token_budget=None, max_new_tokens=MAX_NEW_TOKENS,
+                        batch_stats=None):
+        # llama-cpp-python decodes one sequence at a time; questions run
+        # sequentially but report the same per-batch stats as SQLGenerator
+        results = []
+        batch_stats = [] if batch_stats is None else batch_stats
+        for b, question in enumerate(questions):
+            start = time.time()
+            call = {}
+            raw, sql = self.nl_to_sql(question, max_new_tokens=max_new_tokens, stats=call)
+            elapsed = time.time() - start
+            results.append({"question": question, "raw": raw, "sql": sql,
+                            "completion": raw[len(self.build_prompt(question)):]})
+            stats = {
+                "batch": b,
+                "size": 1,
+                "seconds": elapsed,
+                "questions_per_s": 1 / elapsed,
+                "tokens_per_s": call["new_tokens"] / elapsed,
+                "tokens_saved": call["tokens_saved"],
+            }
+            batch_stats.append(stats)
+            print(f"📦 Batch {b}: 1 question in {elapsed:.2f} s "
+                  f"→ {stats['tokens_per_s']:.1f} tok/s, {stats['tokens_saved']} tokens saved by early stop")
+        return results
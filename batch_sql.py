@@ -0,0 +1,105 @@
+import argparse
+import os
+import sqlite3
+import time
+import pandas as pd
+
+import sqltext
+import backends
+from sql_grammar import build_sqlite_grammar
+from sqltext import rewrite_time_parsing
+from index_advisor import QueryLog
+from query_guard import GuardedExecutor
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Batch NLQ → SQL Runner (e.g. the fixed morning-report question list)
+# ─────────────────────────────────────────────────────────────────────────────
+# Usage:
+#   python batch_sql.py questions.txt --out results.csv --max-batch-size 8
+#
+# The questions file holds one question per line; blank lines and lines
+# starting with '#' are ignored. Generated SQL runs read-only through the
+# same GuardedExecutor as the UI (plan check, row limit, timeout).
+
+def read_questions(path):
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def run_queries(results, conn, log=None, executor=None):
+    executor = executor or GuardedExecutor()
+    rows = []
+    for item in results:
+        start = time.time()
+        truncated = False
+        try:
+            table, truncated, _ = executor.run(conn, item["sql"])
+            n_rows, error = table.num_rows, ""
+            if log is not None:
+                log.record(item["sql"], time.time() - start, n_rows)
+        except Exception as e:
+            n_rows, error = None, str(e)
+        rows.append({
+            "question": item["question"],
+            "sql": item["sql"],
+            "rows": n_rows,
+            "truncated": truncated,
+            "error": error,
+            "query_time": time.time() - start,
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and run SQL for a list of questions.")
+    parser.add_argument("questions", help="text file with one question per line")
+    parser.add_argument("--db", default=sqltext.DB_PATH)
+    parser.add_argument("--backend", default=backends.BACKEND, choices=backends.BACKENDS)
+    parser.add_argument("--out", default="batch_results.csv")
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--token-budget", type=int, default=32768,
+                        help="max rows × (prompt + new tokens) per batch; tune to available memory")
+    parser.add_argument("--max-new-tokens", type=int, default=sqltext.MAX_NEW_TOKENS)
+    parser.add_argument("--constrained", action="store_true",
+                        help="grammar-constrain decoding to SELECTs over the live schema")
+    parser.add_argument("--schema-format", default=sqltext.SCHEMA_FORMAT, choices=sqltext.SCHEMA_FORMATS)
+    parser.add_argument("--query-log", default="db/query_log.db",
+                        help="log executed queries here for index_advisor.py ('' to disable)")
+    args = parser.parse_args()
+
+    questions = read_questions(args.questions)
+    conn = sqlite3.connect(f"file:{os.path.abspath(args.db)}?mode=ro", uri=True)
+
+    load_start = time.time()
+    prompt_template = sqltext.load_prompt_template()
+    columns = sqltext.get_schema_columns(conn)
+    grammar = build_sqlite_grammar(columns, prompt_template) if args.constrained else None
+    handle = backends.load_model(args.backend)
+    schema_text = sqltext.get_schema(conn, fmt=args.schema_format)
+    generator = backends.make_generator(args.backend, handle, prompt_template, schema_text, grammar=grammar)
+    print(f"⏳ Model + prefix cache ready in {time.time() - load_start:.2f} s")
+
+    gen_start = time.time()
+    results = generator.nl_to_sql_batch(
+        questions,
+        max_batch_size=args.max_batch_size,
+        token_budget=args.token_budget,
+        max_new_tokens=args.max_new_tokens,
+    )
+    gen_time = time.time() - gen_start
+    # Generators have no connection; point timestamp parsing at pre-parsed columns
+    for item in results:
+        item["sql"] = rewrite_time_parsing(item["sql"], columns)
+
+    report = run_queries(results, conn, log=QueryLog(args.query_log) if args.query_log else None)
+    report.to_csv(args.out, index=False)
+    conn.close()
+
+    failed = int((report["error"] != "").sum())
+    print(f"✅ {len(questions)} questions in {gen_time:.2f} s "
+          f"({len(questions) / gen_time:.2f} q/s overall), {failed} failed queries → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
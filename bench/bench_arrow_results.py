@@ -0,0 +1,118 @@
+import argparse
+import io
+import os
+import sqlite3
+import sys
+import time
+import altair as alt
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from arrow_results import read_arrow
+from chart_data import CHART_ROW_THRESHOLD
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Result Path Benchmark: pd.read_sql vs cursor → Arrow
+# ─────────────────────────────────────────────────────────────────────────────
+# Run from the repo root:
+#   python bench/bench_arrow_results.py --rows 100000
+#
+# Uses an in-memory table shaped like cleaning_orders (text ids/names/times,
+# numeric durations) so it runs without db/master.db. Every stage the UI runs
+# on a result is timed:
+#   read   – cursor → frame / table (both paths are bound by sqlite3 building
+#            Python row tuples, so this stage is roughly equal)
+#   grid   – Arrow IPC serialisation st.dataframe performs; a pandas frame
+#            is converted to Arrow first
+#   chart  – Altair spec for the un-aggregated chart (first
+#            CHART_ROW_THRESHOLD rows); pandas frames go through Altair's
+#            sanitize + to_dict(records), Arrow tables through to_pylist()
+#   cache  – Parquet result-cache write + hit; a pandas hit needs to_pandas()
+
+def make_db(n_rows):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("""
+        CREATE TABLE orders AS
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        SELECT i AS co_id,
+               'STF' || (i % 250) AS stf_id,
+               CASE i % 3 WHEN 0 THEN 'Departure' WHEN 1 THEN 'Stayover' ELSE 'Touch-up' END AS cleaning_service_type,
+               'Room ' || (2000 + i % 400) AS location_name,
+               datetime(1700000000 + i * 60, 'unixepoch') AS start_time,
+               (i % 97) * 1.5 AS duration_min,
+               i % 2 AS inspection_result
+        FROM n;
+    """, (n_rows,))
+    return conn
+
+
+def ipc_bytes(table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().size
+
+
+def chart_spec(data):
+    return alt.Chart(data).mark_bar().encode(
+        x=alt.X(field="cleaning_service_type", type="nominal"),
+        y=alt.Y(field="duration_min", type="quantitative"),
+        tooltip=[alt.Tooltip(field=c, type="nominal") for c in ("stf_id", "location_name", "start_time")],
+    ).to_dict()
+
+
+def cache_round_trip(table, to_frame):
+    buf = io.BytesIO()
+    pq.write_table(table, buf)
+    hit = pq.read_table(io.BytesIO(buf.getvalue()))
+    return hit.to_pandas() if to_frame else hit
+
+
+def measure(label, conn, sql, read):
+    start = time.time()
+    result = read(sql, conn)
+    read_s = time.time() - start
+    is_frame = isinstance(result, pd.DataFrame)
+
+    start = time.time()
+    table = pa.Table.from_pandas(result, preserve_index=False) if is_frame else result
+    ipc_bytes(table)
+    grid_s = time.time() - start
+
+    start = time.time()
+    chart_spec(result.head(CHART_ROW_THRESHOLD) if is_frame else result.slice(0, CHART_ROW_THRESHOLD))
+    chart_s = time.time() - start
+
+    start = time.time()
+    cache_round_trip(pa.Table.from_pandas(result, preserve_index=False) if is_frame else result, is_frame)
+    cache_s = time.time() - start
+
+    memory = result.memory_usage(deep=True).sum() if is_frame else result.nbytes
+    return {"path": label, "read_s": read_s, "grid_s": grid_s, "chart_s": chart_s, "cache_s": cache_s,
+            "total_s": read_s + grid_s + chart_s + cache_s, "memory_mb": memory / 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pandas vs Arrow result paths.")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    conn = make_db(args.rows)
+    sql = "SELECT * FROM orders;"
+    rows = []
+    for label, read in (("pandas", pd.read_sql), ("arrow", read_arrow)):
+        runs = [measure(label, conn, sql, read) for _ in range(args.repeat)]
+        rows.append(min(runs, key=lambda r: r["total_s"]))
+
+    print(f"| path ({args.rows:,} rows) | read (s) | grid (s) | chart (s) | cache (s) | total (s) | memory (MB) |")
+    print("|---|---|---|---|---|---|---|")
+    for r in rows:
+        print(f"| {r['path']} | {r['read_s']:.3f} | {r['grid_s']:.3f} | {r['chart_s']:.3f} | "
+              f"{r['cache_s']:.3f} | {r['total_s']:.3f} | {r['memory_mb']:.1f} |")
+
+
+if __name__ == "__main__":
+    main()
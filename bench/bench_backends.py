@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sqltext
+import backends
+from batch_sql import read_questions
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Backend Benchmark: load time, peak RSS and tokens/s
+# ─────────────────────────────────────────────────────────────────────────────
+# Run from the repo root:
+#   python bench/bench_backends.py                      # all backends
+#   python bench/bench_backends.py --backends hf-int8 gguf
+#
+# Each backend is measured in its own subprocess so peak RSS is not polluted
+# by weights loaded for a previous backend.
+
+def run_one(backend, questions_path, db_path):
+    questions = read_questions(questions_path)
+    conn = sqlite3.connect(db_path)
+    schema_text = sqltext.get_schema(conn)
+
+    start = time.time()
+    handle = backends.load_model(backend)
+    load_time = time.time() - start
+
+    start = time.time()
+    generator = backends.make_generator(backend, handle, sqltext.load_prompt_template(), schema_text)
+    prefix_time = time.time() - start
+
+    gen_time, new_tokens = 0.0, 0
+    for question in questions:
+        start = time.time()
+        stats = {}
+        generator.nl_to_sql(question, stats=stats)
+        gen_time += time.time() - start
+        new_tokens += stats["new_tokens"]
+
+    return {
+        "backend": backend,
+        "load_s": round(load_time, 2),
+        "prefix_s": round(prefix_time, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "avg_latency_s": round(gen_time / len(questions), 3),
+        "tokens_per_s": round(new_tokens / gen_time, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare inference backends.")
+    parser.add_argument("--backends", nargs="+", default=backends.BACKENDS, choices=backends.BACKENDS)
+    parser.add_argument("--questions", default="bench/questions.txt")
+    parser.add_argument("--db", default=sqltext.DB_PATH)
+    parser.add_argument("--run", help=argparse.SUPPRESS)   # internal: measure a single backend
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_one(args.run, args.questions, args.db)))
+        return
+
+    rows = []
+    for backend in args.backends:
+        print(f"⏱️ Benchmarking {backend} ...")
+        proc = subprocess.run(
+            [sys.executable, __file__, "--run", backend, "--questions", args.questions, "--db", args.db],
+            capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"❌ {backend} failed:\n{proc.stderr.strip().splitlines()[-1] if proc.stderr else ''}")
+            continue
+        rows.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    header = ["backend", "load_s", "prefix_s", "peak_rss_mb", "avg_latency_s", "tokens_per_s"]
+    print("| " + " | ".join(header) + " |")
+    print("|" + "---|" * len(header))
+    for row in rows:
+        print("| " + " | ".join(str(row[h]) for h in header) + " |")
+
+
+if __name__ == "__main__":
+    main()
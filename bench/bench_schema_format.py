@@ -0,0 +1,83 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sqlgen
+from batch_sql import read_questions
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Schema Format Benchmark: prompt tokens, latency and accuracy per format
+# ─────────────────────────────────────────────────────────────────────────────
+# Run from the repo root:
+#   python bench/bench_schema_format.py --formats markdown ddl compact
+#
+# There is no gold SQL for the question set, so accuracy is reported two ways:
+# "runs" = the SQL executes without error, and "same result" = it returns the
+# same rows as the first (baseline) format. Latency includes the prefix
+# prefill, since that is the part a shorter schema makes cheaper.
+
+def result_of(sql, conn):
+    try:
+        return pd.read_sql(sql, conn)
+    except Exception:
+        return None
+
+
+def same_rows(a, b):
+    if a is None or b is None or a.shape != b.shape:
+        return False
+    return sorted(map(tuple, a.astype(str).values)) == sorted(map(tuple, b.astype(str).values))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark schema serialisation formats.")
+    parser.add_argument("--formats", nargs="+", default=sqlgen.SCHEMA_FORMATS, choices=sqlgen.SCHEMA_FORMATS)
+    parser.add_argument("--questions", default="bench/questions.txt")
+    parser.add_argument("--db", default=sqlgen.DB_PATH)
+    args = parser.parse_args()
+
+    questions = read_questions(args.questions)
+    conn = sqlite3.connect(args.db)
+    prompt_template = sqlgen.load_prompt_template()
+    tokenizer, model = sqlgen.load_model()
+
+    rows, baseline = [], None
+    for fmt in args.formats:
+        print(f"⏱️ Running format '{fmt}' ...")
+        schema_text = sqlgen.get_schema(conn, fmt=fmt)
+        start = time.time()
+        generator = sqlgen.SQLGenerator(tokenizer, model, prompt_template, schema_text)
+        prefill = time.time() - start
+
+        gen_time, results = 0.0, []
+        for question in questions:
+            start = time.time()
+            _, sql = generator.nl_to_sql(question)
+            gen_time += time.time() - start
+            results.append(result_of(sql, conn))
+        if baseline is None:
+            baseline = results
+
+        rows.append({
+            "format": fmt,
+            "schema_tokens": sqlgen.count_tokens(schema_text, tokenizer),
+            "prefix_tokens": sqlgen.count_tokens(generator.prompt_prefix, tokenizer),
+            "prefill_s": prefill,
+            "avg_latency_s": gen_time / len(questions),
+            "runs": sum(r is not None for r in results),
+            "same_result": sum(same_rows(a, b) for a, b in zip(results, baseline)),
+        })
+
+    print("| format | schema tokens | prefix tokens | prefill (s) | avg latency (s) | runs | same result |")
+    print("|---|---|---|---|---|---|---|")
+    for r in rows:
+        print(f"| {r['format']} | {r['schema_tokens']} | {r['prefix_tokens']} | {r['prefill_s']:.2f} | "
+              f"{r['avg_latency_s']:.3f} | {r['runs']}/{len(questions)} | {r['same_result']}/{len(questions)} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sqlgen
+from batch_sql import read_questions
+from schema_linking import SchemaLinker
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Schema Pruning Benchmark: prompt tokens and latency, full vs pruned schema
+# ─────────────────────────────────────────────────────────────────────────────
+# Run from the repo root:
+#   python bench/bench_schema_pruning.py
+#   python bench/bench_schema_pruning.py --tokens-only    # tokenizer only, no weights
+#
+# Latency is measured cold for every question (a fresh generator, so the
+# prefix prefill is included), which is what a question with a new table
+# subset costs in the UI. "covered" checks that every table the full-schema
+# SQL uses is also in the pruned selection.
+
+def used_tables(sql, tables):
+    return {t for t in tables if re.search(rf"\b{t}\b", sql, re.IGNORECASE)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark schema-pruned prompts.")
+    parser.add_argument("--questions", default="bench/questions.txt")
+    parser.add_argument("--db", default=sqlgen.DB_PATH)
+    parser.add_argument("--tokens-only", action="store_true", help="only count prompt tokens")
+    args = parser.parse_args()
+
+    questions = read_questions(args.questions)
+    conn = sqlite3.connect(args.db)
+    prompt_template = sqlgen.load_prompt_template()
+    full_schema = sqlgen.get_schema(conn)
+    linker = SchemaLinker(conn, prompt_template)
+
+    if args.tokens_only:
+        from transformers import AutoTokenizer
+        tokenizer, model = AutoTokenizer.from_pretrained(sqlgen.MODEL_NAME), None
+    else:
+        tokenizer, model = sqlgen.load_model()
+
+    def n_tokens(schema_text, question):
+        prefix, suffix = sqlgen.split_prompt(prompt_template, schema_text)
+        return len(tokenizer(prefix + suffix.format(question=question)).input_ids)
+
+    rows = []
+    for question in questions:
+        tables = linker.select(question)
+        pruned_schema = sqlgen.get_schema(conn, tables)
+        row = {
+            "question": question,
+            "tables": len(tables),
+            "full_tokens": n_tokens(full_schema, question),
+            "pruned_tokens": n_tokens(pruned_schema, question),
+        }
+        if model is not None:
+            for label, schema_text in (("full", full_schema), ("pruned", pruned_schema)):
+                start = time.time()
+                generator = sqlgen.SQLGenerator(tokenizer, model, prompt_template, schema_text)
+                _, sql = generator.nl_to_sql(question)
+                row[f"{label}_s"] = time.time() - start
+                row[f"{label}_sql"] = sql
+            row["covered"] = used_tables(row["full_sql"], linker.tables) <= set(tables)
+        rows.append(row)
+        print(f"🔗 {question} → {', '.join(tables)}")
+
+    print("| question | tables | prompt tokens full → pruned |" + ("" if model is None else " latency full → pruned (s) | covered |"))
+    print("|---|---|---|" + ("" if model is None else "---|---|"))
+    for r in rows:
+        line = f"| {r['question']} | {r['tables']}/{len(linker.tables)} | {r['full_tokens']} → {r['pruned_tokens']} |"
+        if model is not None:
+            line += f" {r['full_s']:.2f} → {r['pruned_s']:.2f} | {'✅' if r['covered'] else '❌'} |"
+        print(line)
+
+    full = sum(r["full_tokens"] for r in rows) / len(rows)
+    pruned = sum(r["pruned_tokens"] for r in rows) / len(rows)
+    print(f"\nAvg prompt tokens: {full:.0f} → {pruned:.0f} ({1 - pruned / full:.0%} fewer)")
+    if model is not None:
+        full_s = sum(r["full_s"] for r in rows) / len(rows)
+        pruned_s = sum(r["pruned_s"] for r in rows) / len(rows)
+        covered = sum(r["covered"] for r in rows)
+        print(f"Avg cold latency: {full_s:.2f} s → {pruned_s:.2f} s ({full_s / pruned_s:.2f}×), "
+              f"table coverage {covered}/{len(rows)}, same SQL {sum(r['full_sql'] == r['pruned_sql'] for r in rows)}/{len(rows)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sqlgen
+from batch_sql import read_questions
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Speculative Decoding Benchmark: latency speedup and acceptance
+# ─────────────────────────────────────────────────────────────────────────────
+# Run from the repo root:
+#   python bench/bench_speculative.py --modes off ngram draft
+#
+# Target-model forward passes are counted with a forward hook. Every target
+# pass yields one token of its own, so tokens/pass - 1 is the mean number of
+# accepted draft tokens per verification step. In draft mode each assistant
+# forward proposes one token, which gives the acceptance rate directly.
+
+class ForwardCounter:
+    def __init__(self, model):
+        self.calls = 0
+        model.register_forward_hook(self._hook)
+
+    def _hook(self, module, args, output):
+        self.calls += 1
+
+
+def run_mode(mode, tokenizer, model, prompt_template, schema_text, questions, target, assistant):
+    generator = sqlgen.SQLGenerator(tokenizer, model, prompt_template, schema_text, speculative=mode)
+    total_time, total_tokens, outputs = 0.0, 0, []
+    target.calls = 0
+    if assistant is not None:
+        assistant.calls = 0
+
+    for question in questions:
+        start = time.time()
+        stats = {}
+        _, sql = generator.nl_to_sql(question, stats=stats)
+        total_time += time.time() - start
+        total_tokens += stats["new_tokens"]
+        outputs.append(sql)
+
+    row = {
+        "mode": mode,
+        "avg_latency_s": total_time / len(questions),
+        "tokens_per_s": total_tokens / total_time,
+        "tokens_per_target_pass": total_tokens / max(target.calls, 1),
+        "acceptance_rate": None,
+    }
+    if mode == "draft" and assistant is not None and assistant.calls:
+        accepted = total_tokens - target.calls
+        row["acceptance_rate"] = max(accepted, 0) / assistant.calls
+    return row, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark speculative decoding modes.")
+    parser.add_argument("--modes", nargs="+", default=["off", "ngram", "draft"], choices=["off", "ngram", "draft"])
+    parser.add_argument("--questions", default="bench/questions.txt")
+    parser.add_argument("--db", default=sqlgen.DB_PATH)
+    args = parser.parse_args()
+
+    questions = read_questions(args.questions)
+    conn = sqlite3.connect(args.db)
+    schema_text = sqlgen.get_schema(conn)
+    prompt_template = sqlgen.load_prompt_template()
+
+    tokenizer, model = sqlgen.load_model()
+    target = ForwardCounter(model)
+    assistant = None
+    if "draft" in args.modes:
+        assistant = ForwardCounter(sqlgen.load_draft_model()[1])
+
+    rows, baseline = [], None
+    for mode in args.modes:
+        print(f"⏱️ Running mode '{mode}' ...")
+        row, outputs = run_mode(mode, tokenizer, model, prompt_template, schema_text, questions, target, assistant)
+        if baseline is None:
+            baseline = (row["avg_latency_s"], outputs)
+        row["speedup"] = baseline[0] / row["avg_latency_s"]
+        # Greedy speculative decoding should reproduce the baseline exactly
+        row["same_sql"] = sum(a == b for a, b in zip(outputs, baseline[1]))
+        rows.append(row)
+
+    print("| mode | avg latency (s) | speedup | tokens/s | tokens/target pass | acceptance | same SQL |")
+    print("|---|---|---|---|---|---|---|")
+    for r in rows:
+        acc = f"{r['acceptance_rate']:.2%}" if r["acceptance_rate"] is not None else "n/a"
+        print(f"| {r['mode']} | {r['avg_latency_s']:.3f} | {r['speedup']:.2f}× | {r['tokens_per_s']:.1f} | "
+              f"{r['tokens_per_target_pass']:.2f} | {acc} | {r['same_sql']}/{len(questions)} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import re
+
+from query_guard import strip_sql
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Server-side Aggregation for the Quick Chart
+# ─────────────────────────────────────────────────────────────────────────────
+# Above CHART_ROW_THRESHOLD rows the chart no longer embeds the raw result;
+# SQLite aggregates the y-axis per x value over the *full* generated query
+# (not just the rows shown in the grid), so the payload is at most MAX_BARS
+# points whatever the result size:
+#   category x  → GROUP BY x, top MAX_BARS groups by value
+#   temporal x  → GROUP BY strftime() bucket (hour / day / month by span)
+#   numeric x   → GROUP BY one of NUMERIC_BINS equal-width bins
+# The query is wrapped as a CTE with an explicit column list taken from the
+# result table, so x / y always refer to the columns the user picked, even
+# when duplicate names were renamed (SQLite's own names for duplicates turn
+# random after a few, and an unknown "quoted" name silently becomes a
+# string literal).
+CHART_ROW_THRESHOLD = int(os.environ.get("SQLGEN_CHART_ROW_THRESHOLD", "2000"))
+MAX_BARS = 200
+NUMERIC_BINS = 50
+AGGREGATES = ["sum", "avg", "count", "min", "max"]
+
+DATETIME_RE = re.compile(r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2})?)?")
+
+
+def quote_ident(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def x_kind(table, x, numeric_cols):
+    if x in numeric_cols:
+        return "numeric"
+    sample = [v for v in table.column(x).slice(0, 50).to_pylist() if v is not None]
+    if sample and all(isinstance(v, str) and DATETIME_RE.match(v) for v in sample):
+        return "temporal"
+    return "category"
+
+
+def _time_bucket(days):
+    if days <= 3:
+        return "%Y-%m-%d %H:00", "hour"
+    if days <= 366:
+        return "%Y-%m-%d", "day"
+    return "%Y-%m", "month"
+
+
+def _first_row(run, sql):
+    return list(run(sql).to_pylist()[0].values())
+
+
+def aggregate_sql(run, sql, columns, x, y, kind, agg="sum"):
+    # Returns (sql, description). columns: the result's column names, as
+    # shown to the user. run(sql) → pyarrow.Table executes the one MIN/MAX
+    # query needed to size temporal/numeric buckets (pass the guarded
+    # executor so it gets the same timeout and cache as everything else)
+    if x not in columns or y not in columns:
+        raise ValueError(f"Chart columns {x!r} / {y!r} are not in the result")
+    cte = f"WITH result({', '.join(quote_ident(c) for c in columns)}) AS (\n{strip_sql(sql)}\n)\n"
+    qx, qy = quote_ident(x), quote_ident(y)
+    value = f"COUNT({qy})" if agg == "count" else f"{agg.upper()}({qy})"
+
+    if kind == "category":
+        return (cte + f"SELECT {qx} AS x, {value} AS y FROM result GROUP BY 1 ORDER BY 2 DESC LIMIT {MAX_BARS}",
+                f"{agg} of {y} per {x} (top {MAX_BARS})")
+
+    if kind == "temporal":
+        lo, hi = _first_row(run, cte + f"SELECT julianday(MIN({qx})) AS lo, julianday(MAX({qx})) AS hi FROM result")
+        fmt, unit = _time_bucket((hi - lo) if lo is not None and hi is not None else 0)
+        return (cte + f"SELECT strftime('{fmt}', {qx}) AS x, {value} AS y FROM result "
+                f"WHERE {qx} IS NOT NULL GROUP BY 1 ORDER BY 1",
+                f"{agg} of {y} per {unit} of {x}")
+
+    lo, hi = _first_row(run, cte + f"SELECT MIN({qx}) AS lo, MAX({qx}) AS hi FROM result")
+    if lo is None or hi is None or hi == lo:
+        return (cte + f"SELECT {qx} AS x, {value} AS y FROM result GROUP BY 1 ORDER BY 1",
+                f"{agg} of {y} per {x}")
+    width = (hi - lo) / NUMERIC_BINS
+    bucket = f"MIN(CAST(({qx} - {lo!r}) / {width!r} AS INTEGER), {NUMERIC_BINS - 1})"
+    return (cte + f"SELECT {lo!r} + {bucket} * {width!r} AS x, {value} AS y FROM result "
+            f"WHERE {qx} IS NOT NULL GROUP BY {bucket} ORDER BY 1",
+            f"{agg} of {y} in {NUMERIC_BINS} bins of {x} (width {width:.3g})")
@@ -0,0 +1,96 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Read-only, Pooled SQLite Access for the UIs
+# ─────────────────────────────────────────────────────────────────────────────
+# One pool per process (wrap it in st.cache_resource). At most POOL_SIZE
+# connections are ever opened; each database access checks one out for the
+# duration of a `with` block and returns it afterwards, so the number of
+# connections (each with its own mmap and page cache) stays bounded however
+# many sessions and Streamlit script threads come and go. Connections use a
+# "file:...?mode=ro" URI plus query_only, so generated SQL can never write and
+# a missing database fails loudly instead of creating an empty file.
+#
+#   pool = ReadOnlyPool("db/master.db")
+#   with pool.connection() as conn:
+#       df = pd.read_sql(sql, conn)
+#
+# Do not nest checkouts in one thread: with every connection busy the inner
+# one waits CHECKOUT_TIMEOUT_S and fails.
+MMAP_SIZE = int(os.environ.get("SQLGEN_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+CACHE_SIZE_KB = int(os.environ.get("SQLGEN_DB_CACHE_KB", "65536"))
+POOL_SIZE = int(os.environ.get("SQLGEN_DB_POOL_SIZE", "4"))
+CHECKOUT_TIMEOUT_S = 30
+
+
+class ReadOnlyPool:
+    def __init__(self, path, size=POOL_SIZE, mmap_size=MMAP_SIZE, cache_size_kb=CACHE_SIZE_KB):
+        self.path = path
+        self.uri = Path(path).resolve().as_uri() + "?mode=ro"
+        self.max_size = size
+        self.pragmas = [
+            f"PRAGMA mmap_size = {int(mmap_size)};",
+            f"PRAGMA cache_size = -{int(cache_size_kb)};",    # negative = KiB
+            "PRAGMA temp_store = MEMORY;",
+            "PRAGMA query_only = ON;",
+        ]
+        self._idle = queue.LifoQueue()      # most recently used first: its cache is warm
+        self._lock = threading.Lock()
+        self._opened = 0
+
+    def _open(self):
+        # check_same_thread=False: a connection is checked out by whichever
+        # thread needs it next
+        conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        return conn
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._opened < self.max_size
+            if can_open:
+                self._opened += 1
+        if can_open:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+        try:
+            return self._idle.get(timeout=CHECKOUT_TIMEOUT_S)
+        except queue.Empty:
+            raise RuntimeError(f"All {self.max_size} database connections are busy; try again shortly") from None
+
+    @contextmanager
+    def connection(self):
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            conn.set_progress_handler(None, 0)
+            self._idle.put(conn)
+
+    def size(self):
+        with self._lock:
+            return self._opened
+
+    def close(self):
+        # Closes the idle connections; call once nothing is checked out
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._opened -= 1
@@ -0,0 +1,212 @@
+import argparse
+import csv
+import gzip
+import os
+import sqlite3
+import threading
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from arrow_results import column_array, unique_names
+from query_guard import QueryInterrupted, interruptible
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Streaming Export: table / query → CSV, gzip-CSV or Parquet
+# ─────────────────────────────────────────────────────────────────────────────
+# Rows are pulled from the cursor CHUNK_ROWS at a time and written straight
+# to disk, so memory stays flat however large the extract is. Parquet is
+# written one row group per chunk with the schema fixed by the first chunk
+# (all-null columns become strings).
+#
+# In the UI the export runs in a worker thread under the query guard's
+# progress handler (EXPORT_TIMEOUT_S, Cancel button), and finished files in
+# EXPORT_DIR are deleted after EXPORT_MAX_AGE_H hours or beyond the newest
+# EXPORT_MAX_FILES, so the server's disk does not fill up with extracts.
+#
+#   python exporter.py --table payroll --format parquet
+#   python exporter.py --sql "SELECT * FROM cleaning_orders WHERE ..." --format csv.gz --out co.csv.gz
+EXPORT_DIR = "exports"
+CHUNK_ROWS = 50000
+DOWNLOAD_MAX_MB = 200      # larger files are collected from EXPORT_DIR instead
+EXPORT_TIMEOUT_S = float(os.environ.get("SQLGEN_EXPORT_TIMEOUT", "600"))
+EXPORT_MAX_AGE_H = float(os.environ.get("SQLGEN_EXPORT_MAX_AGE_H", "24"))
+EXPORT_MAX_FILES = int(os.environ.get("SQLGEN_EXPORT_MAX_FILES", "20"))
+FORMATS = {"csv": ".csv", "csv.gz": ".csv.gz", "parquet": ".parquet"}
+
+
+def _write_csv(cur, names, f, chunk_rows, progress):
+    writer = csv.writer(f)
+    writer.writerow(names)
+    done = 0
+    while True:
+        rows = cur.fetchmany(chunk_rows)
+        if not rows:
+            return done
+        writer.writerows(rows)
+        done += len(rows)
+        progress(done)
+
+
+def _write_parquet(cur, names, path, chunk_rows, progress):
+    writer, done = None, 0
+    try:
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            arrays = [column_array(list(values)) for values in zip(*rows)]
+            if writer is None:
+                schema = pa.schema([pa.field(n, pa.string() if pa.types.is_null(a.type) else a.type)
+                                    for n, a in zip(names, arrays)])
+                writer = pq.ParquetWriter(path, schema)
+            for i, field in enumerate(writer.schema):
+                if arrays[i].type != field.type:
+                    try:
+                        arrays[i] = arrays[i].cast(field.type)
+                    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                        raise ValueError(f"Column '{field.name}' changes type from {field.type} to "
+                                         f"{arrays[i].type} mid-export; export as CSV instead")
+            writer.write_table(pa.Table.from_arrays(arrays, schema=writer.schema))
+            done += len(rows)
+            progress(done)
+        if writer is None:      # empty result: still write a valid file with the column names
+            writer = pq.ParquetWriter(path, pa.schema([pa.field(n, pa.string()) for n in names]))
+    finally:
+        if writer is not None:
+            writer.close()
+    return done
+
+
+def export_query(conn, sql, path, fmt="csv", params=(), chunk_rows=CHUNK_ROWS, progress=None):
+    # progress(rows_written) is called after every chunk; returns rows written
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}', expected one of {list(FORMATS)}")
+    progress = progress or (lambda done: None)
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    cur = conn.execute(sql, params)
+    try:
+        names = unique_names([d[0] for d in cur.description])
+        if fmt == "parquet":
+            return _write_parquet(cur, names, path, chunk_rows, progress)
+        opener = gzip.open if fmt == "csv.gz" else open
+        with opener(path, "wt", newline="", encoding="utf-8") as f:
+            return _write_csv(cur, names, f, chunk_rows, progress)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)     # never leave a half-written extract behind
+        raise
+    finally:
+        cur.close()
+
+
+def export_path(name, fmt, export_dir=EXPORT_DIR):
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(export_dir, f"{name}-{stamp}{FORMATS[fmt]}")
+
+
+def cleanup_exports(export_dir=EXPORT_DIR, max_age_h=EXPORT_MAX_AGE_H, max_files=EXPORT_MAX_FILES):
+    # Deletes exports older than max_age_h, then all but the newest max_files
+    if not os.path.isdir(export_dir):
+        return 0
+    files = [os.path.join(export_dir, f) for f in os.listdir(export_dir)]
+    files = sorted((f for f in files if os.path.isfile(f)), key=os.path.getmtime, reverse=True)
+    cutoff = time.time() - max_age_h * 3600
+    removed = 0
+    for i, path in enumerate(files):
+        if i >= max_files or os.path.getmtime(path) < cutoff:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass    # already gone (another session cleaned up)
+    return removed
+
+
+def st_export(conn, sql, name, key, params=(), total=None, timeout_s=EXPORT_TIMEOUT_S):
+    # Streamlit widget: format picker + export button with a progress bar,
+    # then a download button for the finished file (imported lazily so the
+    # CLI does not need Streamlit). The export runs in a worker thread while
+    # the script polls; Cancel (or any rerun) aborts it in SQLite.
+    import streamlit as st
+
+    fmt_col, button_col = st.columns([3, 1])
+    fmt = fmt_col.selectbox("Export format", list(FORMATS), key=f"{key}_format")
+    if button_col.button("📤 Export all rows", key=f"{key}_export"):
+        previous = st.session_state.pop(f"{key}_file", None)
+        if previous is not None and os.path.exists(previous[1]):
+            os.remove(previous[1])
+        cleanup_exports()
+        path = export_path(name, fmt)
+        cancel = threading.Event()
+        outcome = {"done": 0}
+
+        def work():
+            try:
+                with interruptible(conn, timeout_s, cancel):
+                    outcome["rows"] = export_query(conn, sql, path, fmt, params,
+                                                   progress=lambda done: outcome.update(done=done))
+            except Exception as e:
+                outcome["error"] = e
+
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        bar, cancel_box = st.progress(0.0, text="Exporting…"), st.empty()
+        try:
+            cancel_box.button("⏹️ Cancel export", key=f"{key}_cancel")
+            while worker.is_alive():
+                done = outcome["done"]
+                frac = min(done / total, 1.0) if total else 0.0
+                bar.progress(frac, text=f"Exported {done:,}" + (f" of {total:,}" if total else "") + " rows")
+                worker.join(0.2)
+        finally:
+            cancel.set()
+            worker.join()
+            bar.empty()
+            cancel_box.empty()
+        if isinstance(outcome.get("error"), QueryInterrupted):
+            st.warning(f"⏹️ Export stopped: {outcome['error']}")
+            return
+        if "error" in outcome:
+            raise outcome["error"]
+        st.session_state[f"{key}_file"] = ((sql, list(params)), path, outcome["rows"])
+
+    exported = st.session_state.get(f"{key}_file")
+    if exported is None or exported[0] != (sql, list(params)) or not os.path.exists(exported[1]):
+        return
+    _, path, rows = exported
+    size_mb = os.path.getsize(path) / 1e6
+    if size_mb > DOWNLOAD_MAX_MB:
+        st.info(f"📁 {rows:,} rows exported ({size_mb:.0f} MB), too large for a browser download: "
+                f"collect `{os.path.abspath(path)}` from the server.")
+        return
+    with open(path, "rb") as f:
+        st.download_button(f"⬇️ Download {os.path.basename(path)} ({rows:,} rows, {size_mb:.1f} MB)", f,
+                           file_name=os.path.basename(path), key=f"{key}_download")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a table or query to CSV / gzip-CSV / Parquet.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--table")
+    source.add_argument("--sql")
+    parser.add_argument("--db", default="db/master.db")
+    parser.add_argument("--format", default="csv", choices=list(FORMATS))
+    parser.add_argument("--out", help=f"output file (default: {EXPORT_DIR}/<name>-<timestamp>.<ext>)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(f"file:{os.path.abspath(args.db)}?mode=ro", uri=True)
+    sql = f'SELECT * FROM "{args.table}"' if args.table else args.sql
+    out = args.out or export_path(args.table or "query", args.format)
+
+    start = time.time()
+    rows = export_query(conn, sql, out, args.format, chunk_rows=args.chunk_rows,
+                        progress=lambda done: print(f"\r📤 {done:,} rows", end="", flush=True))
+    print(f"\r✅ {rows:,} rows → {out} ({os.path.getsize(out) / 1e6:.1f} MB) in {time.time() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import argparse
+import os
+import re
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from sqltext import list_tables, table_aliases
+from query_guard import GuardedExecutor, QueryInterrupted, QueryRejected
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Index Advisor for the Generated-query Workload
+# ─────────────────────────────────────────────────────────────────────────────
+# mainui.py / batch_sql.py record every executed query in db/query_log.db.
+# The advisor replays that workload through EXPLAIN QUERY PLAN and, for each
+#   SCAN <table>                                  (full table scan) or
+#   SEARCH <table> USING AUTOMATIC ... INDEX      (temp index rebuilt per query)
+# collects the columns of that table used in predicates (=, IN, <, >,
+# BETWEEN, IS) and proposes
+#   CREATE INDEX idx_<table>_<cols> ON <table>(<predicate cols>, <other used cols>)
+# appending the table's other referenced columns while the index stays within
+# MAX_INDEX_COLS, so most lookups are covering. Columns are matched as
+# alias.col, or bare when only one table of the query has that column.
+# The outermost loop of a join is read in full whatever its join keys are
+# indexed on, so for it only filters against constants count; join keys
+# count for the inner loops. LIKE is not considered: SQLite only uses an
+# index for LIKE 'abc%' on a NOCASE index, and substring search goes through
+# the FTS5 indexes instead.
+#
+#   python index_advisor.py --db raw-data/hotel_operations.db            # report only
+#   python index_advisor.py --db raw-data/hotel_operations.db --apply    # create + report
+#
+# Proposals are written to raw-data/advised_indexes.sql, which the ETL
+# scripts apply after every rebuild. Before/after latency is measured by
+# replaying the logged workload (on a temporary copy unless --apply).
+LOG_PATH = "db/query_log.db"
+ADVISED_PATH = "raw-data/advised_indexes.sql"
+MAX_INDEX_COLS = 4
+REPEAT = 3
+
+
+class QueryLog:
+    def __init__(self, path=LOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS query_log (
+                sql TEXT,
+                seconds REAL,
+                n_rows INTEGER,
+                cached INTEGER,
+                executed_at REAL
+            );
+        """)
+        self._conn.commit()
+
+    def record(self, sql, seconds, n_rows, cached=False):
+        with self._lock:
+            self._conn.execute("INSERT INTO query_log VALUES (?, ?, ?, ?, ?);",
+                               (sql.strip(), seconds, n_rows, int(cached), time.time()))
+            self._conn.commit()
+
+    def workload(self, limit=200):
+        # Distinct queries, most frequent first: [(sql, runs)]
+        with self._lock:
+            return self._conn.execute("""
+                SELECT sql, COUNT(*) FROM query_log GROUP BY sql ORDER BY COUNT(*) DESC LIMIT ?;
+            """, (limit,)).fetchall()
+
+
+def _plan_targets(conn, sql):
+    # {alias: outer} for aliases that are fully scanned or get an automatic
+    # index; outer = the first loop under its plan node (the driving table)
+    targets, seen_parents = {}, set()
+    for _, parent, _, detail in conn.execute("EXPLAIN QUERY PLAN " + sql.strip().rstrip(";")):
+        if not detail.startswith(("SCAN ", "SEARCH ")) or detail.startswith("SCAN CONSTANT"):
+            continue
+        outer = parent not in seen_parents
+        seen_parents.add(parent)
+        m = re.match(r"SCAN (\w+)\b(?! VIRTUAL)", detail) or re.match(r"SEARCH (\w+) USING AUTOMATIC", detail)
+        if m:
+            targets[m.group(1)] = targets.get(m.group(1), True) and outer
+    return targets
+
+
+COMPARISON = r"(?:==|=|<>|!=|<=|>=|<|>)"
+CONSTANT_KEYWORDS = {"null", "true", "false", "current_date", "current_time", "current_timestamp"}
+
+
+def _is_column(token):
+    # Right/left-hand side of a comparison that refers to another column
+    # (alias.col or a bare name) rather than a literal, parameter or call
+    token = token.strip()
+    return (bool(re.fullmatch(r"[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)?", token))
+            and token.lower() not in CONSTANT_KEYWORDS)
+
+
+def _predicate_columns(sql, alias, bare=()):
+    # Returns (filters, joins, others): columns of the aliased table compared
+    # with constants, compared with other columns, and otherwise referenced.
+    # bare: column names that resolve to this table when unqualified.
+    sql = re.sub(r"'(?:[^']|'')*'", "''", sql)      # literals cannot contain references
+    names = [rf"\b{re.escape(alias)}\.(\w+)"]
+    if bare:
+        names.append(rf"(?<![\w.])({'|'.join(map(re.escape, bare))})\b(?!\s*[.(])")
+    ref = "(?:" + "|".join(names) + ")"
+
+    def col(m, first):
+        return next(g for g in m.groups()[first:first + len(names)] if g)
+
+    filters, joins = [], []
+    for m in re.finditer(rf"{ref}\s*(?:(IN|BETWEEN|IS)\b|{COMPARISON}\s*([^\s,)]+))", sql, re.IGNORECASE):
+        other = m.group(len(names) + 2)
+        (joins if other is not None and _is_column(other) else filters).append(col(m, 0))
+    for m in re.finditer(rf"([^\s,(]+)\s*{COMPARISON}\s*{ref}", sql, re.IGNORECASE):
+        (joins if _is_column(m.group(1)) else filters).append(col(m, 1))
+    used = [col(m, 0) for m in re.finditer(ref, sql, re.IGNORECASE)]
+    filters, joins = list(dict.fromkeys(filters)), list(dict.fromkeys(joins))
+    return filters, joins, [c for c in dict.fromkeys(used) if c not in filters and c not in joins]
+
+
+def advise(conn, workload):
+    # Returns {(table, cols): runs} for the logged workload
+    tables = set(list_tables(conn))
+    existing = {(t, tuple(c[2] for c in conn.execute(f"PRAGMA index_info({i[1]});")))
+                for t in tables for i in conn.execute(f"PRAGMA index_list({t});")}
+    proposals = {}
+    for sql, runs in workload:
+        try:
+            targets = _plan_targets(conn, sql)
+        except sqlite3.Error:
+            continue    # the query no longer runs against this schema
+        aliases = table_aliases(sql)
+        query_tables = set(aliases.values()) & tables
+        for alias, outer in targets.items():
+            table = aliases.get(alias, alias)
+            if table not in tables:
+                continue
+            columns = [c[1] for c in conn.execute(f"PRAGMA table_info({table});")]
+            # Bare names belong to this table when no other table in the query has them
+            elsewhere = {c[1] for t in query_tables - {table} for c in conn.execute(f"PRAGMA table_info({t});")}
+            bare = [c for c in columns if c not in elsewhere]
+            filters, joins, others = _predicate_columns(sql, alias if alias in aliases else table, bare)
+            keys = [c for c in (filters if outer else joins + filters) if c in columns]
+            if not keys:
+                continue
+            rest = (joins if outer else []) + others
+            cols = tuple(keys + [c for c in rest if c in columns and c not in keys])[:MAX_INDEX_COLS]
+            if any(t == table and idx[:len(cols)] == cols for t, idx in existing):
+                continue
+            proposals[(table, cols)] = proposals.get((table, cols), 0) + runs
+    # Drop proposals that are a prefix of another one on the same table
+    return {(t, c): n for (t, c), n in proposals.items()
+            if not any(t == t2 and c != c2 and c2[:len(c)] == c for t2, c2 in proposals)}
+
+
+def index_ddl(table, cols):
+    return f"CREATE INDEX IF NOT EXISTS idx_{table}_{'_'.join(cols)} ON {table}({', '.join(cols)});"
+
+
+def time_workload(conn, workload, repeat=REPEAT, executor=None):
+    # Replays go through the same guard as the UI (plan check, row limit,
+    # timeout); a replay that times out counts as the full timeout
+    executor = executor or GuardedExecutor()
+    total = 0.0
+    for sql, runs in workload:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            try:
+                executor.run(conn, sql)
+            except QueryInterrupted:
+                samples.append(executor.timeout_s)
+                break
+            except (sqlite3.Error, QueryRejected):
+                break
+            samples.append(time.perf_counter() - start)
+        if samples:
+            total += statistics.median(samples) * runs
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Propose (and optionally create) indexes for the logged workload.")
+    parser.add_argument("--db", default="raw-data/hotel_operations.db")
+    parser.add_argument("--log", default=LOG_PATH)
+    parser.add_argument("--out", default=ADVISED_PATH)
+    parser.add_argument("--apply", action="store_true", help="create the indexes in --db (otherwise a temp copy)")
+    args = parser.parse_args()
+
+    workload = QueryLog(args.log).workload()
+    if not workload:
+        print("⚠️ Query log is empty; run some questions through mainui.py or batch_sql.py first.")
+        return
+
+    tmp_dir = None
+    db_path = args.db
+    if not args.apply:
+        tmp_dir = tempfile.mkdtemp()
+        db_path = os.path.join(tmp_dir, os.path.basename(args.db))
+        shutil.copy(args.db, db_path)
+    conn = sqlite3.connect(db_path)
+
+    proposals = advise(conn, workload)
+    print(f"🔍 {len(workload)} distinct queries ({sum(n for _, n in workload)} runs) → {len(proposals)} index proposals")
+    before = time_workload(conn, workload)
+
+    ddl = [index_ddl(t, c) for (t, c), _ in sorted(proposals.items(), key=lambda p: -p[1])]
+    for (table, cols), runs in sorted(proposals.items(), key=lambda p: -p[1]):
+        print(f"  ➕ {index_ddl(table, cols)}   -- used by {runs} runs")
+    for stmt in ddl:
+        conn.execute(stmt)
+    conn.execute("ANALYZE;")
+    conn.commit()
+    after = time_workload(conn, workload)
+    conn.close()
+
+    if ddl:
+        existing = open(args.out, encoding="utf-8").read().splitlines() if os.path.exists(args.out) else []
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write("\n".join(dict.fromkeys([l for l in existing if l.strip()] + ddl)) + "\n")
+        print(f"📝 Proposals saved to {args.out} (applied by the ETL on every rebuild)")
+    print(f"⏱️ Workload latency: {before:.3f} s → {after:.3f} s"
+          + (f" ({before / after:.1f}× faster)" if after > 0 else "")
+          + ("" if args.apply else " [measured on a temporary copy]"))
+    if tmp_dir:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
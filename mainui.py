@@ -1,30 +1,73 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
-import torch
 import time
+import threading
 import altair as alt
-import re
-from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
 import os
+import sqltext
+from model_client import ModelClient, ModelServerError, SERVER_URL
+from nlq_cache import NLQCache, fingerprint
+from semantic_cache import SemanticCache
+from sql_grammar import CONSTRAINED, build_sqlite_grammar
+from schema_linking import SCHEMA_PRUNING, SchemaLinker
+from db_pool import ReadOnlyPool
+from result_cache import ResultCache
+from query_guard import GuardedExecutor, QueryRejected, QueryInterrupted, page_sql, count_sql
+from arrow_results import numeric_columns, other_columns
+from chart_data import CHART_ROW_THRESHOLD, AGGREGATES, x_kind, aggregate_sql
+from exporter import st_export
+from text_search import fts_columns, fts_state
+from index_advisor import QueryLog
 
-# # ─────────────────────────────────────────────────────────────────────────────
-# # Model Loading with Timing
-# # ─────────────────────────────────────────────────────────────────────────────
-model_load_start = time.time()
+st.set_page_config(layout="wide")
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Background Model Loading
+# ─────────────────────────────────────────────────────────────────────────────
+# Loading the weights (and the embedding model for the semantic cache) takes
+# far longer than anything else, so it runs in a daemon thread shared by all
+# sessions. The page, schema browser and exact cache hits render immediately.
+# With SQLGEN_SERVER_URL set the weights live in model_server.py and this
+# process stays a thin client; otherwise the configured backend loads locally.
+class BackgroundLoader:
+    STAGES = ["semantic cache", "model weights", "ready"]
+
+    def __init__(self):
+        self.stage = self.STAGES[0]
+        self.error = None
+        self.semantic_cache = None
+        self.handle = None
+        self.start = time.time()
+        self.load_time = None
+        self.ready = False
+        threading.Thread(target=self._load, daemon=True).start()
+
+    @property
+    def progress(self):
+        return self.STAGES.index(self.stage) / (len(self.STAGES) - 1)
+
+    def _load(self):
+        try:
+            self.semantic_cache = SemanticCache()
+        except Exception as e:
+            print("⚠️ Semantic cache disabled:", e)     # exact cache still works
+        try:
+            self.stage = "model weights"
+            if not SERVER_URL:
+                import backends
+                self.handle = backends.load_model(backends.BACKEND)
+            self.load_time = time.time() - self.start
+            self.stage = "ready"
+            self.ready = True
+        except Exception as e:
+            self.error = e
+            print("❌ Model loading failed:", e)
 
 @st.cache_resource
-def load_model():
-    tokenizer = AutoTokenizer.from_pretrained("defog/sqlcoder-7b-2")
-    model = AutoModelForCausalLM.from_pretrained(
-        "defog/sqlcoder-7b-2",
-        torch_dtype=torch.float16,
-        device_map="auto"
-    )
-    return tokenizer, model
+def get_loader():
+    return BackgroundLoader()
 
-tokenizer, model = load_model()
-model_load_time = time.time() - model_load_start
+loader = get_loader()
+backend_label = f"server {SERVER_URL}" if SERVER_URL else f"{os.environ.get('SQLGEN_BACKEND', 'hf')} backend"
 
 # model_load_start = time.time()
 
@@ -53,150 +96,377 @@ model_load_time = time.time() - model_load_start
 # ─────────────────────────────────────────────────────────────────────────────
 # Load Prompt Template
 # ─────────────────────────────────────────────────────────────────────────────
-with open("prompt/prompt.txt", "r", encoding="utf-8") as f:
-    prompt_template = f.read()
+prompt_template = sqltext.load_prompt_template()
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Connect to SQLite DB and Schema Fetching
 # ─────────────────────────────────────────────────────────────────────────────
-conn = sqlite3.connect("db/master.db")
+@st.cache_resource
+def get_db_pool():
+    return ReadOnlyPool(sqltext.DB_PATH)
+
+db_pool = get_db_pool()     # `with db_pool.connection() as conn:` around each database access
 
 @st.cache_data
 def get_schema():
-    tables = pd.read_sql(
-        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';",
-        conn)["name"].tolist()
-    
-    schema_md = ""
-    for table in tables:
-        cols = pd.read_sql(f"PRAGMA table_info({table});", conn)
-        schema_md += f"### Table `{table}`\n"
-        schema_md += "| Column | Type |\n|--------|------|\n"
-        for _, col in cols.iterrows():
-            schema_md += f"| `{col['name']}` | `{col['type']}` |\n"
-        schema_md += "\n"
-    return schema_md
+    with db_pool.connection() as conn:
+        return sqltext.get_schema(conn)
 
 schema_text = get_schema()
 
+@st.cache_data
+def get_fts_index(state):
+    # {table: [columns]} with a current FTS5 trigram index, for the LIKE →
+    # MATCH rewrite; recomputed whenever the ETL moves the FTS state
+    with db_pool.connection() as conn:
+        return {t: cols for t in sqltext.list_tables(conn) if (cols := fts_columns(conn, t))}
+
+with db_pool.connection() as conn:
+    fts_index = get_fts_index(fts_state(conn))
+
+@st.cache_data
+def get_schema_columns():
+    # {table: [columns]}, for rewriting timestamp parsing onto pre-parsed columns
+    with db_pool.connection() as conn:
+        return sqltext.get_schema_columns(conn)
+
+schema_columns = get_schema_columns()
+
 # ─────────────────────────────────────────────────────────────────────────────
-# SQL Extraction Helper
+# NLQ → SQL Cache (invalidated when the schema or prompt changes)
 # ─────────────────────────────────────────────────────────────────────────────
-def extract_sql_from_output(output):
-    match = re.search(r"```sql\n(.*?)```", output, re.DOTALL | re.IGNORECASE)
-    if match:
-        return match.group(1).strip()
-    match = re.search(r"(SELECT .*?;)", output, re.DOTALL | re.IGNORECASE)
-    if match:
-        return match.group(1).strip()
-    return output.strip().split("\n")[-1].strip()
+@st.cache_resource
+def get_nlq_cache():
+    return NLQCache()
+
+nlq_cache = get_nlq_cache()
+# Cached SQL has the LIKE → MATCH rewrite baked in, so the set of usable FTS
+# indexes is part of the key: an index that goes stale (or appears) makes
+# earlier answers miss instead of serving MATCH against a stale index
+cache_fingerprint = fingerprint(schema_text, prompt_template, repr(sorted(fts_index.items())))
 
 # ─────────────────────────────────────────────────────────────────────────────
-# SQL Fix Layer for SQLite Compatibility
+# Query Result Cache (invalidated when the ETL bumps table versions)
 # ─────────────────────────────────────────────────────────────────────────────
-def apply_sql_fixes(sql):
-    # Fix ILIKE and LIKE
-    sql = re.sub(r"(\b\w+\.\w+)\s+ILIKE\s+'([^']*)'", lambda m: f"LOWER({m.group(1)}) LIKE LOWER('%{m.group(2)}%')", sql, flags=re.IGNORECASE)
-    sql = re.sub(r"(\b\w+\.\w+)\s+LIKE\s+'([^']*)'", lambda m: f"LOWER({m.group(1)}) LIKE LOWER('%{m.group(2)}%')", sql, flags=re.IGNORECASE)
+@st.cache_resource
+def get_result_cache():
+    return ResultCache()
 
-    # Replace EXTRACT with strftime (Month)
-    sql = re.sub(r"EXTRACT\s*\(\s*MONTH\s+FROM\s+([^)]+?)\s*\)", r"CAST(strftime('%m', \1) AS INTEGER)", sql)
-    sql = re.sub(r"EXTRACT\s*\(\s*YEAR\s+FROM\s+([^)]+?)\s*\)", r"CAST(strftime('%Y', \1) AS INTEGER)", sql)
+result_cache = get_result_cache()
 
-    # Remove PostgreSQL-style casts ::DATE
-    sql = re.sub(r"::\s*DATE", "", sql)
+# Every executed query is logged for index_advisor.py
+@st.cache_resource
+def get_query_log():
+    return QueryLog()
 
-    # Optional: Remove double-quoted column names if any
-    sql = sql.replace('"', '')
+query_log = get_query_log()
 
-    return sql
+# ─────────────────────────────────────────────────────────────────────────────
+# Schema Pruning (SQLGEN_SCHEMA_PRUNING=1: only the tables a question needs)
+# ─────────────────────────────────────────────────────────────────────────────
+@st.cache_resource
+def get_linker(prompt_template, schema_text):
+    with db_pool.connection() as conn:
+        return SchemaLinker(conn, prompt_template)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SQL Generator (static schema/rules prefix is prefilled once per schema)
+# ─────────────────────────────────────────────────────────────────────────────
+# With pruning every distinct table subset gets its own prefilled generator;
+# there are only a handful of subsets in practice, so a small LRU suffices.
+@st.cache_resource(show_spinner="Prefilling prompt prefix…", max_entries=16)
+def get_generator(prompt_template, schema_text, tables=None):
+    # SQLGEN_CONSTRAINED=1 restricts decoding to SELECTs over the live tables/columns
+    grammar = None
+    if CONSTRAINED:
+        columns = schema_columns
+        if tables is not None:
+            columns = {t: cols for t, cols in columns.items() if t in tables}
+        grammar = build_sqlite_grammar(columns, prompt_template)
+    if SERVER_URL:
+        return ModelClient(SERVER_URL, prompt_template, schema_text, grammar=grammar)
+    import backends
+    return backends.make_generator(backends.BACKEND, loader.handle, prompt_template, schema_text, grammar=grammar)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # NLQ to SQL Translation
 # ─────────────────────────────────────────────────────────────────────────────
 def nl_to_sql(nlq):
-    prompt = prompt_template.format(question=nlq, schema=schema_text)
     start = time.time()
-    inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
-    outputs = model.generate(
-        **inputs,
-        max_new_tokens=256,
-        temperature=0.7,
-        top_p=0.9,
-        pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id,
-    )
-    raw = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    sql = extract_sql_from_output(raw)
-    sql = apply_sql_fixes(sql)
-    st.session_state["sqlgen_time"] = time.time() - start
+    # While the model loads the page reruns every second; a question that
+    # already missed the caches is not looked up (and counted) again
+    pending = st.session_state.get("pending_question")
+    cached = nlq_cache.get(nlq, cache_fingerprint) if pending is None or pending[0] != nlq else None
+    if cached is not None:
+        st.session_state["sqlgen_time"] = time.time() - start
+        st.session_state["sqlgen_source"] = "cache"
+        st.session_state["tokens_saved"] = 0
+        print("♻️ Cache hit:\n", cached["sql"])
+        return cached["sql"]
+
+    semantic_cache = loader.semantic_cache
+    similar = None
+    if semantic_cache is not None and pending != (nlq, True):
+        similar = semantic_cache.lookup(nlq, cache_fingerprint)
+    if similar is not None:
+        nlq_cache.put(nlq, cache_fingerprint, None, similar["sql"])
+        st.session_state["sqlgen_time"] = time.time() - start
+        st.session_state["tokens_saved"] = 0
+        st.session_state["sqlgen_source"] = f"similar to '{similar['matched']}' ({similar['score']:.2f})"
+        print("🧭 Semantic hit:", similar["matched"], similar["score"], "\n", similar["sql"])
+        return similar["sql"]
+
+    if not loader.ready:
+        st.session_state["pending_question"] = (nlq, semantic_cache is not None)
+        return None     # caller polls until the model is loaded
+    st.session_state.pop("pending_question", None)
+    if SCHEMA_PRUNING:
+        tables = tuple(get_linker(prompt_template, schema_text).select(nlq))
+        with db_pool.connection() as conn:
+            pruned_schema = sqltext.get_schema(conn, tables)
+        generator = get_generator(prompt_template, pruned_schema, tables)
+        print("🔗 Schema tables:", ", ".join(tables))
+    else:
+        generator = get_generator(prompt_template, schema_text)
+    prompt = generator.build_prompt(nlq)
+    raw = ""
+    gen_stats = {}
+    stream_box = st.empty()
+    for chunk in generator.stream(nlq, stats=gen_stats):
+        raw += chunk
+        stream_box.code(raw, language="sql")
+    stream_box.empty()
+    sql = sqltext.apply_sql_fixes(sqltext.extract_sql_from_output(raw), fts=fts_index, columns=schema_columns)
+    gen_time = time.time() - start
+    nlq_cache.put(nlq, cache_fingerprint, raw, sql)
+    if semantic_cache is not None:
+        semantic_cache.add(nlq, cache_fingerprint, sql, gen_seconds=gen_time)
+    st.session_state["sqlgen_time"] = gen_time
+    st.session_state["sqlgen_source"] = "model"
+    st.session_state["tokens_saved"] = gen_stats["tokens_saved"]
+    st.session_state["tokens_saved_total"] = (st.session_state.get("tokens_saved_total", 0)
+                                              + gen_stats["tokens_saved"])
 
     print("💬 Prompt:\n", prompt)
     print("🧠 Raw Output:\n", raw)
     print("🛠️ Fixed SQL:\n", sql)
+    print(f"✂️ Early stop saved {gen_stats['tokens_saved']} of {sqltext.MAX_NEW_TOKENS} tokens "
+          f"({st.session_state['tokens_saved_total']} this session)")
 
     return sql
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Guarded Query Execution (plan check, row limit, timeout, cancellation)
+# ─────────────────────────────────────────────────────────────────────────────
+executor = GuardedExecutor()
+PAGE_SIZES = [50, 100, 500, 1000]
+
+def run_sql(sql, cancel=None):
+    with db_pool.connection() as conn:
+        return executor.run(conn, sql, cancel=cancel, cache=result_cache)
+
+def cancel_query(sql):
+    st.session_state["cancelled_sql"] = sql
+
+def run_query(sql):
+    # The query runs in a worker thread while this script polls. Clicking
+    # Cancel, asking a new question or pressing Stop interrupts the script at
+    # the next st call, and the finally block aborts the query via the
+    # progress handler instead of leaving it pinned in SQLite.
+    cancel = threading.Event()
+    outcome = {}
+
+    def work():
+        try:
+            outcome["result"] = run_sql(sql, cancel=cancel)
+        except Exception as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=work, daemon=True)
+    start = time.time()
+    worker.start()
+    cancel_box, status = st.empty(), st.empty()
+    try:
+        worker.join(0.2)
+        if worker.is_alive():
+            cancel_box.button("⏹️ Cancel query", on_click=cancel_query, args=(sql,))
+        while worker.is_alive():
+            status.caption(f"⏳ Running query… {time.time() - start:.1f} s")
+            worker.join(0.2)
+    finally:
+        cancel.set()
+        worker.join()
+        cancel_box.empty()
+        status.empty()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Streamlit UI
 # ─────────────────────────────────────────────────────────────────────────────
-st.set_page_config(layout="wide")
 st.title("SQLCoder Query Assistant for Hotel Operations")
-st.markdown(f"<p style='font-size: 0.8rem; color: gray;'>Model load time: {model_load_time:.4f} seconds</p>", unsafe_allow_html=True)
+if loader.error is not None:
+    st.error(f"❌ Model failed to load: {loader.error}")
+elif loader.ready:
+    st.markdown(f"<p style='font-size: 0.8rem; color: gray;'>Model load time: {loader.load_time:.4f} seconds ({backend_label})</p>", unsafe_allow_html=True)
+else:
+    st.markdown(f"<p style='font-size: 0.8rem; color: gray;'>⏳ Loading {loader.stage} ({time.time() - loader.start:.0f} s, {backend_label}) — cached answers work meanwhile</p>", unsafe_allow_html=True)
+
+st.sidebar.markdown("### ♻️ Question Cache")
+if loader.semantic_cache is not None:
+    sem_stats = loader.semantic_cache.stats()
+    st.sidebar.markdown(
+        f"Exact: {nlq_cache.hits} hits / {nlq_cache.misses} misses  \n"
+        f"Semantic: {sem_stats['hits']} hits / {sem_stats['misses']} misses "
+        f"({sem_stats['hit_rate']:.0%})  \n"
+        f"Est. GPU time saved: {sem_stats['est_seconds_saved']:.1f} s"
+    )
+else:
+    st.sidebar.markdown(f"Exact: {nlq_cache.hits} hits / {nlq_cache.misses} misses")
+
+result_stats = result_cache.stats()
+st.sidebar.markdown("### 🗄️ Result Cache")
+st.sidebar.markdown(f"{result_stats['hits']} hits / {result_stats['misses']} misses  \n"
+                    f"{result_stats['entries']} results, {result_stats['bytes'] / 1e6:.1f} MB")
 
 with st.expander("📘 View Database Schema"):
+    st.caption(f"Format: {sqltext.SCHEMA_FORMAT} · ~{sqltext.count_tokens(schema_text)} tokens")
     st.code(schema_text)
 
 question = st.text_input("🔎 Ask a question about the database:")
 
 if question:
     total_start = time.time()
-    sql_query = nl_to_sql(question)
+    try:
+        sql_query = nl_to_sql(question)
+    except (ModelServerError, TimeoutError) as e:
+        st.error(f"❌ {e}")
+        st.stop()
+    if sql_query is None:
+        if loader.error is not None:
+            st.stop()
+        st.info(f"⏳ Model is still loading ({loader.stage}, {time.time() - loader.start:.0f} s) — "
+                "your question will run as soon as it is ready.")
+        st.progress(loader.progress)
+        time.sleep(1)
+        st.rerun()
     st.code(sql_query, language="sql")
 
+    if st.session_state.get("cancelled_sql") == sql_query:
+        st.warning("⏹️ Query cancelled.")
+        st.button("▶️ Run again", on_click=st.session_state.pop, args=("cancelled_sql",))
+        st.stop()
+
     try:
         query_start = time.time()
-        df = pd.read_sql(sql_query, conn)
+        # Results stay a typed pyarrow.Table from the cursor to the grid and chart
+        result, truncated, result_cached = run_query(sql_query)
         st.session_state["query_time"] = time.time() - query_start
+        st.session_state["query_source"] = "cache" if result_cached else "db"
+        query_log.record(sql_query, st.session_state["query_time"], result.num_rows, cached=result_cached)
 
         # Charting
         chart_start = time.time()
         chart_rendered = False
-        if not df.empty and df.select_dtypes(include=["number"]).shape[1] >= 1:
+        if result.num_rows > 0 and numeric_columns(result):
             st.subheader("📊 Quick Chart")
-            numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
-            other_cols = df.select_dtypes(exclude=["number"]).columns.tolist()
+            numeric_cols = numeric_columns(result)
+            other_cols = other_columns(result)
 
             if numeric_cols:
                 x_axis = st.selectbox("X-axis", other_cols if other_cols else numeric_cols)
                 y_axis = st.selectbox("Y-axis", numeric_cols)
 
-                chart = alt.Chart(df).mark_bar().encode(
-                    x=x_axis,
-                    y=y_axis,
-                    tooltip=list(df.columns)
-                ).interactive()
+                if result.num_rows > CHART_ROW_THRESHOLD or truncated:
+                    # Large result: aggregate in SQLite so the chart payload stays small
+                    agg = st.selectbox("Aggregate", AGGREGATES)
+                    kind = x_kind(result, x_axis, numeric_cols)
+                    run_chart = lambda sql: run_sql(sql)[0]
+                    chart_sql, chart_desc = aggregate_sql(run_chart, sql_query, result.column_names, x_axis, y_axis, kind, agg)
+                    chart_data = run_chart(chart_sql)
+                    st.caption(f"📉 {result.num_rows:,}{'+' if truncated else ''} rows → {chart_data.num_rows} points: {chart_desc}")
+                    x_type = {"numeric": "quantitative", "temporal": "temporal", "category": "nominal"}[kind]
+                    chart = alt.Chart(chart_data).mark_bar().encode(
+                        x=alt.X(field="x", type=x_type, title=x_axis),
+                        y=alt.Y(field="y", type="quantitative", title=f"{agg}({y_axis})"),
+                        tooltip=[alt.Tooltip(field="x", type=x_type, title=x_axis),
+                                 alt.Tooltip(field="y", type="quantitative", title=f"{agg}({y_axis})")]
+                    ).interactive()
+                else:
+                    chart = alt.Chart(result).mark_bar().encode(
+                        x=alt.X(field=x_axis, type="quantitative" if x_axis in numeric_cols else "nominal"),
+                        y=alt.Y(field=y_axis, type="quantitative"),
+                        tooltip=[alt.Tooltip(field=c, type="quantitative" if c in numeric_cols else "nominal")
+                                 for c in result.column_names]
+                    ).interactive()
 
                 st.altair_chart(chart, use_container_width=True)
                 chart_rendered = True
 
         st.session_state["chart_time"] = time.time() - chart_start if chart_rendered else 0.0
-        st.success(f"✅ Query returned {len(df)} rows")
-        st.dataframe(df, use_container_width=True)
 
+        # Paginated grid: only the visible page goes to the browser. Pages
+        # inside the first SQLGEN_ROW_LIMIT rows are sliced from the fetched
+        # table; later pages run LIMIT/OFFSET over the generated SQL, and the
+        # total is only counted on request.
+        row_counts = st.session_state.setdefault("row_counts", {})
+        total = row_counts.get(sql_query, None if truncated else result.num_rows)
+        if total is None:
+            st.success(f"✅ Query returned more than {result.num_rows:,} rows")
+            if st.button("🔢 Count all rows"):
+                counted = run_sql(count_sql(sql_query))[0]
+                row_counts[sql_query] = counted.column("n")[0].as_py()
+                st.rerun()
+        else:
+            st.success(f"✅ Query returned {total:,} rows")
+
+        page_col, size_col = st.columns([3, 1])
+        page_size = size_col.selectbox("Rows per page", PAGE_SIZES, index=1)
+        n_pages = max(1, -(-total // page_size)) if total is not None else None
+        # Keyed on the query and page count: a new query (or page size, or a
+        # fresh row count) gets a new widget that starts at page 1 instead of
+        # carrying over a page number that may exceed the new max_value
+        page_key = f"page_{fingerprint(sql_query, str(page_size), str(n_pages))[:16]}"
+        page = page_col.number_input(f"Page (of {n_pages if n_pages else 'many'})",
+                                     min_value=1, max_value=n_pages, value=1, step=1, key=page_key)
+        offset = (page - 1) * page_size
+        if offset + page_size <= result.num_rows or not truncated:
+            page_rows = result.slice(offset, page_size)
+        else:
+            page_rows = run_sql(page_sql(sql_query, offset, page_size))[0]
+        if page_rows.num_rows == 0 and page > 1:
+            st.info("No rows on this page.")
+        else:
+            st.caption(f"Rows {offset + 1:,}–{offset + page_rows.num_rows:,}")
+        st.dataframe(page_rows, use_container_width=True)
+
+        with st.expander("📤 Export full result"):
+            with db_pool.connection() as conn:
+                executor.check_plan(conn, sql_query)
+                st_export(conn, sql_query, "query", key="result", total=total)
+
+    except QueryRejected as e:
+        st.error(f"🚫 Query rejected: {e}")
+    except QueryInterrupted as e:
+        st.warning(f"⏹️ {e}")
     except Exception as e:
         st.error(f"❌ Query failed: {e}")
 
     total_time = time.time() - total_start
     st.markdown("""
     <div style='font-size: 0.8rem; color: gray;'>
-        📝 SQL Generation Time: {:.4f} s &nbsp; | &nbsp;
-        🧰 Query Execution Time: {:.4f} s &nbsp; | &nbsp;
+        📝 SQL Generation Time: {:.4f} s ({}, {} tokens saved by early stop) &nbsp; | &nbsp;
+        🧰 Query Execution Time: {:.4f} s ({}) &nbsp; | &nbsp;
         📊 Chart Render Time: {:.4f} s &nbsp; | &nbsp;
         ⏱️ Total Time: {:.4f} s
     </div>
     """.format(
         st.session_state.get("sqlgen_time", 0),
+        st.session_state.get("sqlgen_source", "model"),
+        st.session_state.get("tokens_saved", 0),
         st.session_state.get("query_time", 0),
+        st.session_state.get("query_source", "db"),
         st.session_state.get("chart_time", 0),
         total_time
     ), unsafe_allow_html=True)
@@ -0,0 +1,87 @@
+import http.client
+import json
+import os
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Thin Client for model_server.py
+# ─────────────────────────────────────────────────────────────────────────────
+# Mirrors the SQLGenerator interface so the UIs can swap a local model for the
+# shared server without other changes. Only the standard library is imported,
+# so client processes never load torch/transformers or the weights.
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = int(os.environ.get("SQLGEN_SERVER_PORT", "8765"))
+SERVER_URL = os.environ.get("SQLGEN_SERVER_URL")   # unset → UIs load the model locally
+REQUEST_TIMEOUT = 600
+
+
+class ModelServerError(RuntimeError):
+    pass
+
+
+class ModelClient:
+    def __init__(self, url, prompt_template, schema_text, grammar=None):
+        self.url = url.rstrip("/")
+        self.prompt_template = prompt_template
+        self.schema_text = schema_text
+        self.grammar = grammar
+
+    def health(self):
+        with urllib.request.urlopen(f"{self.url}/health", timeout=5) as resp:
+            return json.loads(resp.read())
+
+    def _post(self, question, max_new_tokens):
+        body = json.dumps({
+            "prompt_template": self.prompt_template,
+            "schema_text": self.schema_text,
+            "question": question,
+            "max_new_tokens": max_new_tokens,
+            "grammar": self.grammar,
+        }).encode("utf-8")
+        req = urllib.request.Request(f"{self.url}/generate", data=body,
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT) as resp:
+                return json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            try:
+                detail = json.loads(e.read()).get("error", e.reason)
+            except ValueError:
+                detail = e.reason
+            raise ModelServerError(f"Model server error ({e.code}): {detail}") from None
+        except (http.client.HTTPException, OSError) as e:
+            # URLError / timeouts / resets are OSErrors; a dropped connection
+            # mid-response is an HTTPException (e.g. RemoteDisconnected)
+            raise ModelServerError(f"Model server at {self.url} unreachable: {getattr(e, 'reason', e)}") from None
+
+    def build_prompt(self, nlq):
+        return self.prompt_template.format(question=nlq, schema=self.schema_text)
+
+    def _generate(self, nlq, max_new_tokens, stats):
+        result = self._post(nlq, max_new_tokens)
+        if stats is not None:
+            stats.update(new_tokens=max_new_tokens - result.get("tokens_saved", 0),
+                         tokens_saved=result.get("tokens_saved", 0))
+        return result
+
+    def nl_to_sql(self, nlq, max_new_tokens=256, stats=None):
+        result = self._generate(nlq, max_new_tokens, stats)
+        return result["raw"], result["sql"]
+
+    def generate(self, nlq, max_new_tokens=256, stats=None):
+        return self.nl_to_sql(nlq, max_new_tokens=max_new_tokens, stats=stats)[0]
+
+    def stream(self, nlq, max_new_tokens=256, stats=None):
+        # The server answers whole batches, so the "stream" is a single chunk;
+        # like SQLGenerator.stream it is the completion only, without the prompt
+        yield self._generate(nlq, max_new_tokens, stats)["completion"]
+
+    def nl_to_sql_batch(self, questions, max_batch_size=8, token_budget=None, max_new_tokens=256,
+                        batch_stats=None):
+        # Fire requests concurrently so the server can batch them together;
+        # batching happens server-side, so batch_stats is left empty
+        with ThreadPoolExecutor(max_workers=max_batch_size) as pool:
+            results = list(pool.map(lambda q: self._post(q, max_new_tokens), questions))
+        return [{"question": q, "raw": r["raw"], "sql": r["sql"]} for q, r in zip(questions, results)]
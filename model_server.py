@@ -0,0 +1,197 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import backends
+from nlq_cache import fingerprint
+from model_client import SERVER_HOST, SERVER_PORT
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Shared Model Server
+# ─────────────────────────────────────────────────────────────────────────────
+# One process holds the weights; Streamlit apps talk to it through
+# model_client.ModelClient over localhost HTTP.
+#
+#   python model_server.py --backend hf --port 8765
+#   SQLGEN_SERVER_URL=http://127.0.0.1:8765 streamlit run mainui.py
+#
+# Requests land in a queue; a single worker thread drains whatever is waiting
+# (up to --max-batch-size, lingering --max-wait-ms for stragglers) and runs it
+# through nl_to_sql_batch, so requests that arrive while a batch is decoding
+# are picked up by the very next batch. This is static micro-batching: a
+# batch runs to completion before the next one starts, so a short request
+# can wait behind a long one (iteration-level batching would need a custom
+# decode loop over a shared paged KV cache). Each client sends its own prompt
+# template + schema, and the server keeps one prefix-cached generator per
+# (template, schema, grammar) fingerprint so different dashboards share the weights.
+# Each generator holds a prefix KV cache on the device and schema pruning
+# sends a different schema per table subset, so the generators are an LRU of
+# at most MAX_PROFILES entries (mainui caps its local ones the same way).
+MAX_PROFILES = int(os.environ.get("SQLGEN_SERVER_MAX_PROFILES", "16"))
+
+class BatchingWorker:
+    def __init__(self, backend, handle, max_batch_size=8, max_wait_ms=20, token_budget=32768,
+                 max_profiles=MAX_PROFILES):
+        self.backend = backend
+        self.handle = handle
+        self.max_batch_size = max_batch_size
+        self.token_budget = token_budget
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self.generators = OrderedDict()
+        self.max_profiles = max_profiles
+        self.served = 0
+        self.batches = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, prompt_template, schema_text, question, max_new_tokens, grammar=None):
+        item = {
+            "fp": fingerprint(schema_text, prompt_template, grammar or ""),
+            "prompt_template": prompt_template,
+            "schema_text": schema_text,
+            "grammar": grammar,
+            "question": question,
+            "max_new_tokens": max_new_tokens,
+            "done": threading.Event(),
+            "result": None,
+        }
+        self.queue.put(item)
+        item["done"].wait()
+        return item["result"]
+
+    def _generator(self, item):
+        if item["fp"] in self.generators:
+            self.generators.move_to_end(item["fp"])
+            return self.generators[item["fp"]]
+        while len(self.generators) >= self.max_profiles:
+            self.generators.popitem(last=False)     # drop the least recently used prefix cache
+        self.generators[item["fp"]] = backends.make_generator(
+            self.backend, self.handle, item["prompt_template"], item["schema_text"], grammar=item["grammar"])
+        return self.generators[item["fp"]]
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self.queue.get(timeout=max(deadline - time.time(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Group by prompt profile and max_new_tokens; each group is one generate call
+            groups = {}
+            for item in batch:
+                groups.setdefault((item["fp"], item["max_new_tokens"]), []).append(item)
+
+            for (_, max_new_tokens), items in groups.items():
+                try:
+                    generator = self._generator(items[0])
+                    batch_stats = []
+                    results = generator.nl_to_sql_batch(
+                        [i["question"] for i in items],
+                        max_batch_size=len(items),
+                        token_budget=self.token_budget,
+                        max_new_tokens=max_new_tokens,
+                        batch_stats=batch_stats,
+                    )
+                    saved = sum(b["tokens_saved"] for b in batch_stats) // len(items)
+                    for item, res in zip(items, results):
+                        item["result"] = {"raw": res["raw"], "completion": res["completion"], "sql": res["sql"],
+                                          "tokens_saved": saved, "batch_size": len(items)}
+                except Exception as e:
+                    for item in items:
+                        item["result"] = {"error": str(e)}
+                self.batches += 1
+                self.served += len(items)
+                for item in items:
+                    item["done"].set()
+
+
+def make_handler(worker):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"backend": worker.backend, "queued": worker.queue.qsize(),
+                                 "served": worker.served, "batches": worker.batches,
+                                 "profiles": len(worker.generators)})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/generate":
+                self._send(404, {"error": "not found"})
+                return
+            req, error = self._parse_request()
+            if error is not None:
+                self._send(400, {"error": error})
+                return
+            result = worker.submit(req["prompt_template"], req["schema_text"], req["question"],
+                                   req["max_new_tokens"], req.get("grammar"))
+            self._send(500 if "error" in result else 200, result)
+
+        def _parse_request(self):
+            # Returns (request, None) or (None, error message) for a 400
+            try:
+                req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            except ValueError:
+                return None, "body must be JSON"
+            if not isinstance(req, dict):
+                return None, "body must be a JSON object"
+            for field in ("prompt_template", "schema_text", "question"):
+                if not isinstance(req.get(field), str):
+                    return None, f"'{field}' must be a string"
+            if req.get("grammar") is not None and not isinstance(req["grammar"], str):
+                return None, "'grammar' must be a string"
+            req.setdefault("max_new_tokens", backends.MAX_NEW_TOKENS)
+            if not isinstance(req["max_new_tokens"], int) or req["max_new_tokens"] < 1:
+                return None, "'max_new_tokens' must be a positive integer"
+            return req, None
+
+        def log_message(self, format, *args):
+            pass    # keep the console for batch stats
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve SQL generation to the Streamlit apps.")
+    parser.add_argument("--backend", default=backends.BACKEND, choices=backends.BACKENDS)
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=int, default=20)
+    parser.add_argument("--token-budget", type=int, default=32768)
+    parser.add_argument("--max-profiles", type=int, default=MAX_PROFILES,
+                        help="prefix-cached generators kept (LRU), one per template/schema/grammar")
+    args = parser.parse_args()
+
+    start = time.time()
+    handle = backends.load_model(args.backend)
+    print(f"⏳ {args.backend} model loaded in {time.time() - start:.2f} s")
+
+    worker = BatchingWorker(args.backend, handle, args.max_batch_size, args.max_wait_ms, args.token_budget,
+                            args.max_profiles)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(worker))
+    print(f"🚀 Model server listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import sqlite3
+import hashlib
+import threading
+import time
+import re
+import os
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Persistent NLQ → SQL Cache
+# ─────────────────────────────────────────────────────────────────────────────
+# Entries are keyed on the normalised question plus a fingerprint of the
+# schema text and prompt template, so any schema/prompt change invalidates
+# every previously generated answer automatically.
+CACHE_PATH = "db/nlq_cache.db"
+MAX_ENTRIES = 1000
+TTL_SECONDS = 7 * 24 * 3600
+
+
+def normalize_question(question):
+    q = question.strip().lower()
+    q = re.sub(r"\s+", " ", q)          # collapse whitespace
+    q = re.sub(r"[\s?.!]+$", "", q)     # drop trailing punctuation
+    return q
+
+
+def fingerprint(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class NLQCache:
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES, ttl_seconds=TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS nlq_cache (
+                question TEXT,
+                fingerprint TEXT,
+                raw_output TEXT,
+                sql TEXT,
+                created_at REAL,
+                last_used REAL,
+                PRIMARY KEY (question, fingerprint)
+            );
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_nlq_cache_last_used ON nlq_cache(last_used);")
+        self._conn.commit()
+
+    def get(self, question, fp):
+        key = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT raw_output, sql, created_at FROM nlq_cache WHERE question = ? AND fingerprint = ?;",
+                (key, fp)).fetchone()
+            if row is None or now - row[2] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE nlq_cache SET last_used = ? WHERE question = ? AND fingerprint = ?;",
+                (now, key, fp))
+            self._conn.commit()
+            self.hits += 1
+            return {"raw": row[0], "sql": row[1]}
+
+    def put(self, question, fp, raw, sql):
+        key = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO nlq_cache VALUES (?, ?, ?, ?, ?, ?);",
+                (key, fp, raw, sql, now, now))
+            self._evict(fp, now)
+            self._conn.commit()
+
+    def _evict(self, fp, now):
+        # Entries from an older schema/prompt can never hit again
+        self._conn.execute("DELETE FROM nlq_cache WHERE fingerprint != ?;", (fp,))
+        self._conn.execute("DELETE FROM nlq_cache WHERE created_at < ?;", (now - self.ttl_seconds,))
+        # LRU: keep only the most recently used max_entries rows
+        self._conn.execute("""
+            DELETE FROM nlq_cache WHERE rowid NOT IN (
+                SELECT rowid FROM nlq_cache ORDER BY last_used DESC LIMIT ?
+            );
+        """, (self.max_entries,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM nlq_cache;")
+            self._conn.commit()
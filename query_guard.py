@@ -0,0 +1,160 @@
+import os
+import time
+from contextlib import contextmanager
+
+from arrow_results import read_arrow
+from sqltext import table_aliases
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Guarded Execution of Generated SQL
+# ─────────────────────────────────────────────────────────────────────────────
+# Generated SQL is untrusted: one missing join condition turns
+# cleaning_orders × service_requests into a multi-billion-row loop. Every
+# query therefore
+#   1. goes through EXPLAIN QUERY PLAN; nested full scans whose estimated
+#      row product exceeds MAX_PLAN_ROWS are rejected before running,
+#   2. is wrapped as "SELECT * FROM (<sql>) LIMIT row_limit + 1" so at most
+#      row_limit rows are fetched (the extra row only flags truncation),
+#   3. runs under a sqlite3 progress handler that aborts it once the
+#      wall-clock budget is spent or the caller sets the cancel event.
+QUERY_TIMEOUT_S = float(os.environ.get("SQLGEN_QUERY_TIMEOUT", "15"))
+ROW_LIMIT = int(os.environ.get("SQLGEN_ROW_LIMIT", "10000"))
+MAX_PLAN_ROWS = int(os.environ.get("SQLGEN_MAX_PLAN_ROWS", "50000000"))
+PROGRESS_OPS = 10000    # VM instructions between timeout/cancel checks
+
+
+class QueryRejected(Exception):
+    pass
+
+
+class QueryInterrupted(Exception):
+    pass
+
+
+def strip_sql(sql):
+    return sql.strip().rstrip(";").strip()
+
+
+def inject_limit(sql, limit):
+    # Newline before ")" so a trailing "-- comment" cannot swallow it
+    return f"SELECT * FROM (\n{strip_sql(sql)}\n) LIMIT {int(limit)}"
+
+
+def page_sql(sql, offset, limit):
+    return f"SELECT * FROM (\n{strip_sql(sql)}\n) LIMIT {int(limit)} OFFSET {int(offset)}"
+
+
+def count_sql(sql):
+    return f"SELECT COUNT(*) AS n FROM (\n{strip_sql(sql)}\n)"
+
+
+@contextmanager
+def interruptible(conn, timeout_s, cancel=None):
+    # Statements run on conn inside the block are aborted by a progress
+    # handler once timeout_s passes or cancel is set; SQLite's "interrupted"
+    # error then surfaces as QueryInterrupted
+    deadline = time.time() + timeout_s
+    state = {"reason": None}
+
+    def progress():
+        if cancel is not None and cancel.is_set():
+            state["reason"] = "cancelled"
+        elif time.time() > deadline:
+            state["reason"] = f"timed out after {timeout_s:g} s"
+        return 1 if state["reason"] else 0
+
+    conn.set_progress_handler(progress, PROGRESS_OPS)
+    try:
+        yield
+    except Exception as e:
+        if state["reason"] is not None:
+            raise QueryInterrupted(f"Query {state['reason']}") from e
+        raise
+    finally:
+        conn.set_progress_handler(None, 0)
+
+
+class GuardedExecutor:
+    def __init__(self, timeout_s=QUERY_TIMEOUT_S, row_limit=ROW_LIMIT, max_plan_rows=MAX_PLAN_ROWS):
+        self.timeout_s = timeout_s
+        self.row_limit = row_limit
+        self.max_plan_rows = max_plan_rows
+        self._row_estimates = {}
+
+    def _estimate_rows(self, conn, table):
+        # MAX(rowid) is an O(log n) stand-in for COUNT(*) on rowid tables;
+        # anything it cannot size counts as large rather than as one row
+        if table not in self._row_estimates:
+            try:
+                self._row_estimates[table] = conn.execute(f"SELECT MAX(rowid) FROM {table};").fetchone()[0] or 0
+            except Exception:
+                self._row_estimates[table] = self.max_plan_rows
+        return self._row_estimates[table]
+
+    def _loop_cost(self, plan, node, size):
+        # Sibling SCANs under one node are nested loops, so their sizes
+        # multiply; correlated subqueries run once per outer row and multiply
+        # too, while other subqueries (MATERIALIZE, SCALAR/LIST SUBQUERY,
+        # COMPOUND ...) run once and only count on their own.
+        cost, scans, worst = 1, 0, (0, 0)
+        for node_id, parent, _, detail in plan:
+            if parent != node:
+                continue
+            if detail.startswith("SCAN ") and not detail.startswith("SCAN CONSTANT"):
+                cost *= max(size(detail.split()[1]), 1)
+                scans += 1
+            elif detail.startswith("CORRELATED"):
+                sub_cost, sub_scans = self._loop_cost(plan, node_id, size)
+                cost *= max(sub_cost, 1)
+                scans += sub_scans
+            else:
+                worst = max(worst, self._loop_cost(plan, node_id, size))
+        return max((cost, scans), worst)
+
+    def check_plan(self, conn, sql):
+        plan = conn.execute("EXPLAIN QUERY PLAN " + strip_sql(sql)).fetchall()
+        # Plan steps name the alias, or the table itself when it has none; a
+        # name missing from the parsed aliases is tried as a table, so an
+        # unparsed FROM clause cannot make a scan look like a single row.
+        # A CTE or subquery (MATERIALIZE / CO-ROUTINE step) is sized by the
+        # row product of the scans that build it.
+        aliases = table_aliases(sql)
+        subqueries = {detail.split()[1]: node_id for node_id, _, _, detail in plan
+                      if detail.startswith(("MATERIALIZE ", "CO-ROUTINE "))}
+        sub_sizes = {}
+
+        def size(name):
+            for key in (name, aliases.get(name)):
+                if key in subqueries:
+                    if key not in sub_sizes:
+                        sub_sizes[key] = self.max_plan_rows     # a recursive CTE scanning itself
+                        sub_sizes[key] = self._loop_cost(plan, subqueries[key], size)[0]
+                    return sub_sizes[key]
+            return self._estimate_rows(conn, aliases.get(name, name))
+
+        cost, scans = self._loop_cost(plan, 0, size)
+        if scans >= 2 and cost > self.max_plan_rows:
+            raise QueryRejected(
+                f"Query plan nests {scans} full table scans (~{cost:,.0f} row combinations, limit "
+                f"{self.max_plan_rows:,}). Check the join conditions.")
+        return plan
+
+    def fetch(self, conn, sql, cancel=None):
+        # sql is run as given; the progress handler enforces time and cancel
+        with interruptible(conn, self.timeout_s, cancel):
+            return read_arrow(sql, conn)
+
+    def run(self, conn, sql, cancel=None, cache=None):
+        # Returns (pyarrow.Table, truncated, served_from_cache)
+        limited = inject_limit(sql, self.row_limit + 1)
+
+        def execute(query, conn):
+            self.check_plan(conn, sql)
+            return self.fetch(conn, query, cancel)
+
+        if cache is not None:
+            table, cached = cache.read_sql(limited, conn, execute=execute)
+        else:
+            table, cached = execute(limited, conn), False
+        truncated = table.num_rows > self.row_limit
+        return table.slice(0, self.row_limit) if truncated else table, truncated, cached
@@ -1,7 +1,10 @@
 import pandas as pd
 import sqlite3
+import os
 import re
 
+from rollups import ROLLUPS
+
 # ─────────────────────────────────────────────────────────────
 # Helper: Standardize column names
 # ─────────────────────────────────────────────────────────────
@@ -171,6 +174,81 @@ service_df = service_requests.rename(columns={
 
 service_df.to_sql("service_requests", conn, if_exists="append", index=False)
 
+# ─────────────────────────────────────────────────────────────
+# Full-text index over service request text
+# ─────────────────────────────────────────────────────────────
+# Trigram tokens make MATCH a case-insensitive substring test, so the fix
+# layer can turn LIKE '%aircon%' scans into index lookups. Both ETL scripts
+# rebuild it with service_requests, and its table_versions row is set to the
+# table's version below; text_search.fts_columns() ignores an index whose
+# version lags, so a stale index is never queried.
+# The external-content index points at service_requests' implicit rowids
+# (the request id is a TEXT key), which VACUUM may renumber: after a VACUUM run
+#   INSERT INTO service_requests_fts(service_requests_fts) VALUES ('rebuild');
+cur.execute("DROP TABLE IF EXISTS service_requests_fts;")
+cur.execute("""
+CREATE VIRTUAL TABLE service_requests_fts USING fts5(
+    remarks,
+    service_item,
+    service_category,
+    guest_name,
+    content='service_requests',
+    content_rowid='rowid',
+    tokenize='trigram'
+);
+""")
+cur.execute("INSERT INTO service_requests_fts(service_requests_fts) VALUES ('rebuild');")
+
+# ─────────────────────────────────────────────────────────────
+# Indexes: declared foreign keys + index_advisor.py proposals
+# ─────────────────────────────────────────────────────────────
+for t in tables:
+    for fk in cur.execute(f"PRAGMA foreign_key_list({t});").fetchall():
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{t}_{fk[3]} ON {t}({fk[3]});")
+if os.path.exists("advised_indexes.sql"):
+    with open("advised_indexes.sql", encoding="utf-8") as f:
+        for stmt in filter(str.strip, f.read().split(";")):
+            try:
+                cur.execute(stmt)
+            except sqlite3.OperationalError as e:
+                print(f"⚠️ Skipping advised index ({e}): {stmt.strip()}")
+cur.execute("ANALYZE;")
+
+# ─────────────────────────────────────────────────────────────
+# Bump table versions (query result caches drop stale results)
+# ─────────────────────────────────────────────────────────────
+cur.execute("""
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER,
+    updated_at TEXT
+);
+""")
+for t in tables:
+    cur.execute("""
+    INSERT INTO table_versions VALUES (?, 1, datetime('now'))
+    ON CONFLICT(table_name) DO UPDATE SET version = version + 1, updated_at = datetime('now');
+    """, (t,))
+
+# The FTS index is current for this version of service_requests
+cur.execute("""
+INSERT INTO table_versions SELECT 'service_requests_fts', version, datetime('now')
+FROM table_versions WHERE table_name = 'service_requests'
+ON CONFLICT(table_name) DO UPDATE SET version = excluded.version, updated_at = excluded.updated_at;
+""")
+
+# ─────────────────────────────────────────────────────────────
+# Drop materialized rollups
+# ─────────────────────────────────────────────────────────────
+# rollups.py is written against merge.py's schema (prop_id, *_epoch,
+# duration_seconds), which this ETL does not produce; drop the rollups and
+# their watermarks rather than leave stale totals that the prompt tells
+# the model to prefer (merge.py rebuilds them)
+for spec in ROLLUPS:
+    cur.execute(f"DROP TABLE IF EXISTS {spec['table']};")
+    cur.execute("DELETE FROM table_versions WHERE table_name = ?;", (spec["table"],))
+cur.execute("DROP TABLE IF EXISTS rollup_state;")
+
 # Commit & close
 conn.commit()
 conn.close()
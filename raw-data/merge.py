@@ -1,7 +1,10 @@
 import pandas as pd
 import sqlite3
+import os
 import re
 
+from rollups import refresh_rollups, check_rollups
+
 # ─────────────────────────────────────────────────────────────
 # Helper: Standardize column names
 # ─────────────────────────────────────────────────────────────
@@ -11,6 +14,26 @@ def clean_column_name(name):
     name = re.sub(r'_+', '_', name)              # collapse multiple underscores
     return name.strip('_')
 
+# ─────────────────────────────────────────────────────────────
+# Helper: Pre-parsed time columns
+# ─────────────────────────────────────────────────────────────
+# Text timestamps are kept as-is and also stored as integer epoch seconds
+# (wall-clock time read as UTC, so datetime(x_epoch, 'unixepoch') gives back
+# the original text) plus year/month/day/hour parts, so time-bucketed
+# queries filter and group on indexed integers instead of parsing strings.
+def add_time_columns(df, column, parts=False):
+    prefix = column[:-len("_time")]
+    ts = pd.to_datetime(df[column], errors="coerce", format="mixed")
+    df[f"{prefix}_epoch"] = ((ts - pd.Timestamp("1970-01-01")) // pd.Timedelta(seconds=1)).astype("Int64")
+    if parts:
+        for part in ["year", "month", "day", "hour"]:
+            df[f"{prefix}_{part}"] = getattr(ts.dt, part).astype("Int64")
+    return df
+
+def to_seconds(values):
+    # "0:27:00" → 1620
+    return pd.to_timedelta(values, errors="coerce").dt.total_seconds().astype("Int64")
+
 # ─────────────────────────────────────────────────────────────
 # Load CSVs
 # ─────────────────────────────────────────────────────────────
@@ -104,6 +127,13 @@ CREATE TABLE cleaning_orders (
     duration TEXT,
     inspector_name TEXT,
     inspection_result TEXT,
+    start_epoch INTEGER,
+    complete_epoch INTEGER,
+    duration_seconds INTEGER,
+    start_year INTEGER,
+    start_month INTEGER,
+    start_day INTEGER,
+    start_hour INTEGER,
     FOREIGN KEY(stf_id) REFERENCES staff(stf_id),
     FOREIGN KEY(prop_id) REFERENCES properties(prop_id)
 );
@@ -124,6 +154,13 @@ CREATE TABLE service_requests (
     deadline_time TEXT,
     completed_time TEXT,
     assigned_stf_id TEXT,
+    created_epoch INTEGER,
+    deadline_epoch INTEGER,
+    completed_epoch INTEGER,
+    created_year INTEGER,
+    created_month INTEGER,
+    created_day INTEGER,
+    created_hour INTEGER,
     FOREIGN KEY(assigned_stf_id) REFERENCES staff(stf_id),
     FOREIGN KEY(prop_id) REFERENCES properties(prop_id)
 );
@@ -176,6 +213,9 @@ cleaning_df = cleaning_orders.rename(columns={
     "pass_fail": "inspection_result"
 })[["stf_id", "cleaning_service_type", "prop_id", "location_uuid",
     "location_name", "start_time", "complete_time", "duration", "inspector_name", "inspection_result"]]
+cleaning_df = add_time_columns(cleaning_df, "start_time", parts=True)
+cleaning_df = add_time_columns(cleaning_df, "complete_time")
+cleaning_df["duration_seconds"] = to_seconds(cleaning_df["duration"])
 
 cleaning_df.to_sql("cleaning_orders", conn, if_exists="append", index=False)
 
@@ -190,11 +230,91 @@ service_df = service_requests.rename(columns={
     "date_time_completed": "completed_time",
     "assigned_to_user": "assigned_stf_id",
     "service_item_category": "service_category"
-})[["sr_id", "guest_name", "location", "prop_id", "service_category", "service_item", "quantity",
+})[["sr_id", "guest_name", "location", "prop_id", "prop_name", "service_category", "service_item", "quantity",
     "remarks", "status", "created_time", "deadline_time", "completed_time", "assigned_stf_id"]]
+service_df = add_time_columns(service_df, "created_time", parts=True)
+service_df = add_time_columns(service_df, "deadline_time")
+service_df = add_time_columns(service_df, "completed_time")
 
 service_df.to_sql("service_requests", conn, if_exists="append", index=False)
 
+# ─────────────────────────────────────────────────────────────
+# Full-text index over service request text
+# ─────────────────────────────────────────────────────────────
+# Trigram tokens make MATCH a case-insensitive substring test, so the fix
+# layer can turn LIKE '%aircon%' scans into index lookups. Both ETL scripts
+# rebuild it with service_requests, and its table_versions row is set to the
+# table's version below; text_search.fts_columns() ignores an index whose
+# version lags, so a stale index is never queried.
+# The external-content index points at service_requests' implicit rowids
+# (the request id is a TEXT key), which VACUUM may renumber: after a VACUUM run
+#   INSERT INTO service_requests_fts(service_requests_fts) VALUES ('rebuild');
+cur.execute("DROP TABLE IF EXISTS service_requests_fts;")
+cur.execute("""
+CREATE VIRTUAL TABLE service_requests_fts USING fts5(
+    remarks,
+    service_item,
+    service_category,
+    guest_name,
+    content='service_requests',
+    content_rowid='rowid',
+    tokenize='trigram'
+);
+""")
+cur.execute("INSERT INTO service_requests_fts(service_requests_fts) VALUES ('rebuild');")
+
+# ─────────────────────────────────────────────────────────────
+# Indexes: declared foreign keys, pre-parsed times, index_advisor.py proposals
+# ─────────────────────────────────────────────────────────────
+for t in tables:
+    for fk in cur.execute(f"PRAGMA foreign_key_list({t});").fetchall():
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{t}_{fk[3]} ON {t}({fk[3]});")
+cur.execute("CREATE INDEX IF NOT EXISTS idx_cleaning_orders_start_epoch ON cleaning_orders(start_epoch);")
+cur.execute("CREATE INDEX IF NOT EXISTS idx_cleaning_orders_start_ymdh ON cleaning_orders(start_year, start_month, start_day, start_hour);")
+cur.execute("CREATE INDEX IF NOT EXISTS idx_service_requests_created_epoch ON service_requests(created_epoch);")
+cur.execute("CREATE INDEX IF NOT EXISTS idx_service_requests_created_ymdh ON service_requests(created_year, created_month, created_day, created_hour);")
+if os.path.exists("advised_indexes.sql"):
+    with open("advised_indexes.sql", encoding="utf-8") as f:
+        for stmt in filter(str.strip, f.read().split(";")):
+            try:
+                cur.execute(stmt)
+            except sqlite3.OperationalError as e:
+                print(f"⚠️ Skipping advised index ({e}): {stmt.strip()}")
+cur.execute("ANALYZE;")
+
+# ─────────────────────────────────────────────────────────────
+# Bump table versions (query result caches drop stale results)
+# ─────────────────────────────────────────────────────────────
+cur.execute("""
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER,
+    updated_at TEXT
+);
+""")
+for t in tables:
+    cur.execute("""
+    INSERT INTO table_versions VALUES (?, 1, datetime('now'))
+    ON CONFLICT(table_name) DO UPDATE SET version = version + 1, updated_at = datetime('now');
+    """, (t,))
+
+# The FTS index is current for this version of service_requests
+cur.execute("""
+INSERT INTO table_versions SELECT 'service_requests_fts', version, datetime('now')
+FROM table_versions WHERE table_name = 'service_requests'
+ON CONFLICT(table_name) DO UPDATE SET version = excluded.version, updated_at = excluded.updated_at;
+""")
+
+# ─────────────────────────────────────────────────────────────
+# Materialized rollups (rebuilt in full: the fact tables were recreated)
+# ─────────────────────────────────────────────────────────────
+for t, n in refresh_rollups(conn, full=True).items():
+    print(f"📦 {t}: {n:,} source rows")
+mismatches = check_rollups(conn)
+if mismatches:
+    conn.rollback()
+    raise RuntimeError("Rollups do not match their source tables:\n  " + "\n  ".join(mismatches))
+
 # Commit & close
 conn.commit()
 conn.close()
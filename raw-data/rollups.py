@@ -0,0 +1,221 @@
+import argparse
+import hashlib
+import sqlite3
+import time
+
+# ─────────────────────────────────────────────────────────────
+# Materialized Rollups for the Common Report Questions
+# ─────────────────────────────────────────────────────────────
+# Most manager questions reduce to a handful of aggregates. Each rollup is
+# a small summary table keyed on its GROUP BY columns, shown to the model
+# in the schema (the prompt rules say to prefer them), so dashboards read a
+# few hundred rows instead of the raw fact tables.
+#
+# Refresh is incremental: rollup_state keeps the last source rowid folded
+# into each rollup, and new rows are aggregated and merged with
+#   INSERT ... ON CONFLICT(key) DO UPDATE SET n = n + excluded.n
+# Only additive columns (counts / sums) are merged. Ratios and averages are
+# recomputed from them afterwards. rollup_state also keeps a hash of the
+# source row at the watermark: if that row is gone or changed, the source
+# was rebuilt (e.g. by an ETL run) and the rollup is rebuilt in full rather
+# than folding only the rows above the old watermark into stale totals.
+# In-place UPDATEs or deletes of older source rows still need --full; the
+# ETL always does a full refresh. check_rollups() compares every summed
+# column with the same aggregate computed directly over the source table
+# (spec["checks"]) and is run after each refresh.
+#
+#   python rollups.py --db hotel_operations.db          # fold in new rows
+#   python rollups.py --db hotel_operations.db --full   # rebuild
+ROLLUPS = [
+    {
+        "table": "rollup_staff_inspections",
+        "source": "cleaning_orders",
+        "key": ["stf_id"],
+        "attrs": ["stf_name", "prop_id"],
+        "sums": ["total_inspections", "failed_inspections"],
+        "derived": {"fail_rate": "1.0 * failed_inspections / NULLIF(total_inspections, 0)"},
+        # inspection_result holds the CSV's 'Pass' / 'Fail'
+        "select": """
+            SELECT COALESCE(c.stf_id, 'unknown'), s.stf_name, s.prop_id,
+                   COUNT(c.inspection_result), COUNT(*) FILTER (WHERE c.inspection_result = 'Fail')
+            FROM cleaning_orders c LEFT JOIN staff s ON c.stf_id = s.stf_id
+            WHERE c.rowid > ? AND c.rowid <= ?
+            GROUP BY 1
+        """,
+        "checks": {"total_inspections": "COUNT(inspection_result)",
+                   "failed_inspections": "COUNT(*) FILTER (WHERE inspection_result = 'Fail')"},
+    },
+    {
+        "table": "rollup_property_daily_requests",
+        "source": "service_requests",
+        "key": ["prop_id", "request_date"],
+        "attrs": ["prop_name", "created_year", "created_month", "created_day"],
+        "types": {"created_year": "INTEGER", "created_month": "INTEGER", "created_day": "INTEGER"},
+        "sums": ["total_requests", "completed_requests", "redirected_requests", "late_requests"],
+        "derived": {},
+        # service_requests carries its own prop_id ('P1' / 'P2') and prop_name,
+        # derived from the room number by merge.py; properties is keyed on UUIDs
+        "select": """
+            SELECT COALESCE(r.prop_id, 'unknown'), COALESCE(date(r.created_epoch, 'unixepoch'), 'unknown'),
+                   r.prop_name, r.created_year, r.created_month, r.created_day,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE r.completed_epoch IS NOT NULL),
+                   COUNT(*) FILTER (WHERE r.status = 'redirected'),
+                   COUNT(*) FILTER (WHERE r.completed_epoch > r.deadline_epoch)
+            FROM service_requests r
+            WHERE r.rowid > ? AND r.rowid <= ?
+            GROUP BY 1, 2
+        """,
+        "checks": {"total_requests": "COUNT(*)",
+                   "completed_requests": "COUNT(*) FILTER (WHERE completed_epoch IS NOT NULL)",
+                   "redirected_requests": "COUNT(*) FILTER (WHERE status = 'redirected')",
+                   "late_requests": "COUNT(*) FILTER (WHERE completed_epoch > deadline_epoch)"},
+    },
+    {
+        "table": "rollup_payroll_nationality",
+        "source": "payroll",
+        "key": ["nationality", "pay_period_start"],
+        "attrs": [],
+        "sums": ["payslips", "total_gross_pay", "total_net_pay", "total_cpf_contribution", "total_bonuses"],
+        "types": {"total_gross_pay": "REAL", "total_net_pay": "REAL", "total_cpf_contribution": "REAL",
+                  "total_bonuses": "REAL"},
+        "derived": {},
+        "select": """
+            SELECT COALESCE(s.nationality, 'unknown'), COALESCE(pr.pay_period_start, 'unknown'),
+                   COUNT(*), TOTAL(pr.gross_pay), TOTAL(pr.net_pay), TOTAL(pr.cpf_contribution), TOTAL(pr.bonuses)
+            FROM payroll pr LEFT JOIN staff s ON pr.stf_id = s.stf_id
+            WHERE pr.rowid > ? AND pr.rowid <= ?
+            GROUP BY 1, 2
+        """,
+        "checks": {"payslips": "COUNT(*)", "total_gross_pay": "TOTAL(gross_pay)", "total_net_pay": "TOTAL(net_pay)",
+                   "total_cpf_contribution": "TOTAL(cpf_contribution)", "total_bonuses": "TOTAL(bonuses)"},
+    },
+    {
+        "table": "rollup_cleaning_durations",
+        "source": "cleaning_orders",
+        "key": ["cleaning_service_type", "prop_id"],
+        "attrs": [],
+        "sums": ["total_orders", "timed_orders", "total_duration_seconds"],
+        "types": {"total_duration_seconds": "REAL"},
+        "derived": {"avg_duration_minutes": "total_duration_seconds / 60.0 / NULLIF(timed_orders, 0)"},
+        "select": """
+            SELECT COALESCE(c.cleaning_service_type, 'unknown'), COALESCE(c.prop_id, 'unknown'),
+                   COUNT(*), COUNT(c.duration_seconds), TOTAL(c.duration_seconds)
+            FROM cleaning_orders c
+            WHERE c.rowid > ? AND c.rowid <= ?
+            GROUP BY 1, 2
+        """,
+        "checks": {"total_orders": "COUNT(*)", "timed_orders": "COUNT(duration_seconds)",
+                   "total_duration_seconds": "TOTAL(duration_seconds)"},
+    },
+]
+
+
+def _create(conn, spec):
+    # Keys are TEXT NOT NULL, attributes TEXT, sums INTEGER, derived REAL
+    # unless spec["types"] says otherwise
+    types = spec.get("types", {})
+    cols = ([f"{c} TEXT NOT NULL" for c in spec["key"]]
+            + [f"{c} {types.get(c, 'TEXT')}" for c in spec["attrs"]]
+            + [f"{c} {types.get(c, 'INTEGER')}" for c in spec["sums"]]
+            + [f"{c} REAL" for c in spec["derived"]])
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {spec['table']} "
+                 f"({', '.join(cols)}, PRIMARY KEY ({', '.join(spec['key'])}));")
+
+
+def _merge_sql(spec):
+    cols = spec["key"] + spec["attrs"] + spec["sums"]
+    updates = [f"{c} = excluded.{c}" for c in spec["attrs"]] + [f"{c} = {c} + excluded.{c}" for c in spec["sums"]]
+    return (f"INSERT INTO {spec['table']} ({', '.join(cols)}) {spec['select'].strip()} "
+            f"ON CONFLICT({', '.join(spec['key'])}) DO UPDATE SET {', '.join(updates)};")
+
+
+def _row_hash(conn, source, rowid):
+    row = conn.execute(f"SELECT * FROM {source} WHERE rowid = ?;", (rowid,)).fetchone()
+    return None if row is None else hashlib.sha1(repr(row).encode("utf-8")).hexdigest()
+
+
+def refresh_rollups(conn, full=False):
+    # Returns {rollup table: source rows folded in}; the caller commits
+    state_cols = [c[1] for c in conn.execute("PRAGMA table_info(rollup_state);")]
+    if state_cols and "last_row_hash" not in state_cols:
+        conn.execute("DROP TABLE rollup_state;")     # older layout: rebuild everything once
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS rollup_state (
+            table_name TEXT PRIMARY KEY,
+            last_rowid INTEGER,
+            last_row_hash TEXT,
+            refreshed_at TEXT
+        );
+    """)
+    has_versions = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='table_versions';").fetchone()
+    folded = {}
+    for spec in ROLLUPS:
+        table = spec["table"]
+        _create(conn, spec)
+        row = conn.execute("SELECT last_rowid, last_row_hash FROM rollup_state WHERE table_name = ?;",
+                           (table,)).fetchone()
+        last = row[0] if row else 0
+        high = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {spec['source']};").fetchone()[0]
+        rebuilt = row is not None and last > 0 and _row_hash(conn, spec["source"], last) != row[1]
+        if full or rebuilt or row is None:
+            conn.execute(f"DELETE FROM {table};")
+            last = 0
+        if high == last and row is not None:
+            folded[table] = 0
+            continue
+        conn.execute(_merge_sql(spec), (last, high))
+        for col, expr in spec["derived"].items():
+            conn.execute(f"UPDATE {table} SET {col} = {expr};")
+        conn.execute("""
+            INSERT INTO rollup_state VALUES (?, ?, ?, datetime('now'))
+            ON CONFLICT(table_name) DO UPDATE SET last_rowid = excluded.last_rowid,
+                last_row_hash = excluded.last_row_hash, refreshed_at = excluded.refreshed_at;
+        """, (table, high, _row_hash(conn, spec["source"], high)))
+        if has_versions:
+            conn.execute("""
+            INSERT INTO table_versions VALUES (?, 1, datetime('now'))
+            ON CONFLICT(table_name) DO UPDATE SET version = version + 1, updated_at = datetime('now');
+            """, (table,))
+        folded[table] = high - last
+    return folded
+
+
+def check_rollups(conn):
+    # Returns ["table.column: rollup X != source Y", ...]; empty when every
+    # summed column matches the aggregate over its source table
+    mismatches = []
+    for spec in ROLLUPS:
+        for col, expr in spec["checks"].items():
+            rolled = conn.execute(f"SELECT TOTAL({col}) FROM {spec['table']};").fetchone()[0]
+            direct = conn.execute(f"SELECT {expr} FROM {spec['source']};").fetchone()[0]
+            if abs(rolled - direct) > 1e-6 * max(abs(direct), 1):
+                mismatches.append(f"{spec['table']}.{col}: rollup {rolled:,.2f} != source {direct:,.2f}")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the materialized rollup tables.")
+    parser.add_argument("--db", default="hotel_operations.db")
+    parser.add_argument("--full", action="store_true", help="rebuild instead of folding in new rows")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    start = time.time()
+    folded = refresh_rollups(conn, full=args.full)
+    conn.commit()
+    for table, n in folded.items():
+        rows = conn.execute(f"SELECT COUNT(*) FROM {table};").fetchone()[0]
+        print(f"  📦 {table}: +{n:,} source rows → {rows:,} rows")
+    mismatches = check_rollups(conn)
+    conn.close()
+    for m in mismatches:
+        print(f"  ❌ {m}")
+    if mismatches:
+        raise SystemExit("Rollups do not match their source tables; rerun with --full")
+    print(f"✅ Rollups refreshed and checked in {time.time() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import io
+import os
+import re
+import sqlite3
+import threading
+import time
+import pyarrow.parquet as pq
+
+from arrow_results import read_arrow
+from nlq_cache import fingerprint
+from sqltext import list_tables
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Query Result Cache (Parquet blobs, invalidated by table versions)
+# ─────────────────────────────────────────────────────────────────────────────
+# Results are keyed by the normalised SQL text plus a version token for the
+# data it reads:
+#   - the ETL scripts in raw-data/ bump table_versions(table_name, version)
+#     for every table they rebuild; the token covers the tables the SQL names
+#   - databases without table_versions fall back to the file's size/mtime
+#     (plus the -wal file), so any write still invalidates everything.
+# PRAGMA data_version is not used as the token: it is per connection and only
+# moves on commits from *other* connections, so it cannot be compared across
+# processes or restarts of this persistent cache.
+#
+# Entries are Arrow tables stored as Parquet (pyarrow ships with Streamlit),
+# LRU-evicted to stay under MAX_BYTES.
+CACHE_PATH = "db/result_cache.db"
+MAX_BYTES = int(os.environ.get("SQLGEN_RESULT_CACHE_MB", "256")) * 1024 * 1024
+MAX_RESULT_BYTES = MAX_BYTES // 8
+
+
+def normalize_sql(sql):
+    # Collapse whitespace and case outside string literals, drop the trailing ';'
+    parts = re.split(r"('(?:[^']|'')*')", sql.strip().rstrip(";").strip())
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r"\s+", " ", parts[i]).lower()
+    return "".join(parts).strip()
+
+
+def table_version_token(conn, sql):
+    has_versions = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='table_versions';").fetchone()
+    tables = [t for t in list_tables(conn) if re.search(rf"\b{t}\b", sql, re.IGNORECASE)]
+    if has_versions and tables:
+        rows = conn.execute(
+            f"SELECT table_name, version FROM table_versions WHERE table_name IN ({','.join('?' * len(tables))}) "
+            "ORDER BY table_name;", tables).fetchall()
+        if len(rows) == len(tables):
+            return "v:" + ",".join(f"{t}={v}" for t, v in rows)
+
+    path = conn.execute("PRAGMA database_list;").fetchone()[2]
+    token = "f:"
+    for p in (path, path + "-wal"):
+        if p and os.path.exists(p):
+            st = os.stat(p)
+            token += f"{st.st_size}:{st.st_mtime_ns};"
+    return token
+
+
+class ResultCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES, max_result_bytes=MAX_RESULT_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_result_bytes = max_result_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS result_cache (
+                key TEXT PRIMARY KEY,
+                sql TEXT,
+                data BLOB,
+                n_rows INTEGER,
+                bytes INTEGER,
+                created_at REAL,
+                last_used REAL
+            );
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_result_cache_last_used ON result_cache(last_used);")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM result_cache WHERE key = ?;", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE result_cache SET last_used = ? WHERE key = ?;", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return pq.read_table(io.BytesIO(row[0]))
+
+    def put(self, key, sql, table):
+        buf = io.BytesIO()
+        try:
+            pq.write_table(table, buf)
+        except Exception as e:
+            print("⚠️ Result not cached:", e)
+            return
+        data = buf.getvalue()
+        if len(data) > self.max_result_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO result_cache VALUES (?, ?, ?, ?, ?, ?, ?);",
+                (key, sql, data, table.num_rows, len(data), now, now))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # LRU: drop least recently used rows until the total fits in max_bytes
+        self._conn.execute("""
+            DELETE FROM result_cache WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(bytes) OVER (ORDER BY last_used DESC) AS running FROM result_cache
+                ) WHERE running > ?
+            );
+        """, (self.max_bytes,))
+
+    def read_sql(self, sql, conn, execute=None):
+        # Returns (pyarrow.Table, served_from_cache); execute(sql, conn) runs
+        # misses (e.g. query_guard.GuardedExecutor), defaulting to read_arrow
+        key = fingerprint(normalize_sql(sql), table_version_token(conn, sql))
+        table = self.get(key)
+        if table is not None:
+            return table, True
+        table = (execute or read_arrow)(sql, conn)
+        self.put(key, sql, table)
+        return table, False
+
+    def stats(self):
+        with self._lock:
+            n, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM result_cache;").fetchone()
+        return {"entries": n, "bytes": total, "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM result_cache;")
+            self._conn.commit()
@@ -0,0 +1,130 @@
+import math
+import os
+import re
+from collections import deque
+
+from sqltext import get_schema_columns, parse_aliases
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Schema Linking: pick only the tables a question needs
+# ─────────────────────────────────────────────────────────────────────────────
+# Each table is indexed by keywords from its name, column names, a sample of
+# distinct text values and every prompt rule that mentions it (through its
+# alias, e.g. "r.status" or "c.inspection_result"). Keywords are IDF-weighted
+# so terms shared by every table (ids, prop_id ...) do not decide anything.
+# Selected tables are then connected through the join rules in the prompt so
+# the model always sees the bridge tables it needs (e.g. staff between
+# cleaning_orders and payroll).
+SCHEMA_PRUNING = os.environ.get("SQLGEN_SCHEMA_PRUNING", "0") == "1"
+SAMPLE_VALUES = 30
+MIN_RELATIVE_SCORE = 0.3    # keep tables scoring at least 30% of the best match
+
+STOPWORDS = {"the", "a", "an", "of", "for", "to", "in", "on", "by", "and", "or", "is", "are", "was", "were",
+             "what", "which", "who", "how", "many", "much", "each", "per", "with", "from", "all", "list",
+             "show", "give", "me", "do", "does", "did", "there", "that", "this", "than", "more", "most",
+             "use", "id", "uuid", "name", "as", "be", "it", "its", "their", "have", "has"}
+
+
+def _stem(word):
+    if len(word) <= 4:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("sses", "xes", "ches", "shes", "uses")):
+        return word[:-2]
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    if word.endswith("s") and not word.endswith(("ss", "us")):
+        return word[:-1]
+    return word
+
+
+def keywords(text):
+    words = re.findall(r"[a-z0-9]+", text.lower().replace("_", " "))
+    return {_stem(w) for w in words if len(w) > 1 and w not in STOPWORDS}
+
+
+class SchemaLinker:
+    def __init__(self, conn, prompt_template, sample_values=SAMPLE_VALUES):
+        self.columns = get_schema_columns(conn)
+        self.tables = list(self.columns)
+        aliases = parse_aliases(prompt_template)
+        alias_to_table = {a: t for t, a in aliases.items()}
+        self.index = {t: keywords(t) | keywords(" ".join(cols)) for t, cols in self.columns.items()}
+
+        # Sample values of text columns (service items, job titles, results ...)
+        for table, cols in self.columns.items():
+            types = {c[1]: (c[2] or "").upper() for c in conn.execute(f"PRAGMA table_info({table});")}
+            for col in cols:
+                if "CHAR" not in types[col] and "TEXT" not in types[col] and types[col] != "":
+                    continue
+                rows = conn.execute(
+                    f"SELECT DISTINCT {col} FROM {table} WHERE {col} IS NOT NULL LIMIT ?;", (sample_values,))
+                for (value,) in rows:
+                    if isinstance(value, str) and len(value) <= 40:
+                        self.index[table] |= keywords(value)
+
+        # Prompt rules: join lines ("x.col = y.col") become graph edges, every
+        # other rule line adds its words to the tables it references
+        self.edges = {t: set() for t in self.tables}
+        rules = prompt_template.split("### Rules", 1)[-1]
+        for line in rules.splitlines():
+            joins = re.findall(r"\b(\w+)\.\w+\s*=\s*(\w+)\.\w+", line)
+            for a, b in joins:
+                ta, tb = alias_to_table.get(a, a), alias_to_table.get(b, b)
+                if ta in self.edges and tb in self.edges and ta != tb:
+                    self.edges[ta].add(tb)
+                    self.edges[tb].add(ta)
+            if joins:
+                continue
+            refs = {alias_to_table.get(a, a) for a in re.findall(r"\b(\w+)\.\w+", line)}
+            for t in refs & set(self.tables):
+                self.index[t] |= keywords(re.sub(r"\b\w+\.\w+", " ", line))
+
+        # IDF over tables
+        df = {}
+        for kws in self.index.values():
+            for w in kws:
+                df[w] = df.get(w, 0) + 1
+        n = len(self.tables)
+        self.idf = {w: math.log((n + 1) / c) for w, c in df.items()}
+
+    def scores(self, question):
+        q = keywords(question)
+        scores = {t: sum(self.idf[w] for w in q & self.index[t]) for t in self.tables}
+        # Naming the table itself ("service requests", "payroll") is the strongest signal
+        for t in self.tables:
+            if keywords(t) and keywords(t) <= q:
+                scores[t] += 2 * sum(self.idf[w] for w in keywords(t))
+        return scores
+
+    def _path(self, start, goals):
+        # BFS over the join graph to the nearest already-selected table
+        prev, queue = {start: None}, deque([start])
+        while queue:
+            node = queue.popleft()
+            if node in goals and node != start:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = prev[node]
+                return path
+            for nxt in self.edges[node]:
+                if nxt not in prev:
+                    prev[nxt] = node
+                    queue.append(nxt)
+        return [start]
+
+    def select(self, question):
+        scores = self.scores(question)
+        best = max(scores.values())
+        if best <= 0:
+            return list(self.tables)    # nothing matched: fall back to the full schema
+        picked = sorted((t for t in self.tables if scores[t] >= MIN_RELATIVE_SCORE * best),
+                        key=lambda t: -scores[t])
+
+        selected = {picked[0]}
+        for table in picked[1:]:
+            selected |= set(self._path(table, selected))
+        return [t for t in self.tables if t in selected]
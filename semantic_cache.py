@@ -0,0 +1,158 @@
+import sqlite3
+import threading
+import time
+import os
+import numpy as np
+
+from nlq_cache import CACHE_PATH, MAX_ENTRIES, TTL_SECONDS, normalize_question
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Semantic Near-Duplicate Question Cache
+# ─────────────────────────────────────────────────────────────────────────────
+# Sits behind the exact-match NLQCache: questions are embedded with a small
+# CPU sentence-embedding model and compared (cosine, NumPy brute force) with
+# every previously answered question for the current schema/prompt
+# fingerprint. Above the threshold the stored SQL is reused as-is.
+# Entries expire and are evicted with the same TTL / LRU bound as NLQCache,
+# which also keeps the brute-force scan to at most MAX_ENTRIES vectors
+# (a ~1000 × 384 matrix-vector product, well under a millisecond).
+EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SIMILARITY_THRESHOLD = float(os.environ.get("NLQ_SIMILARITY_THRESHOLD", "0.92"))
+
+
+class SemanticCache:
+    def __init__(self, path=CACHE_PATH, threshold=SIMILARITY_THRESHOLD, model_name=EMBED_MODEL,
+                 max_entries=MAX_ENTRIES, ttl_seconds=TTL_SECONDS):
+        from sentence_transformers import SentenceTransformer
+
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.encoder = SentenceTransformer(model_name, device="cpu")
+        self.hits = 0
+        self.misses = 0
+        self.gen_seconds = 0.0      # total model time spent on misses
+        self.gen_count = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS nlq_embeddings (
+                question TEXT,
+                fingerprint TEXT,
+                embedding BLOB,
+                sql TEXT,
+                created_at REAL,
+                last_used REAL,
+                PRIMARY KEY (question, fingerprint)
+            );
+        """)
+        cols = [c[1] for c in self._conn.execute("PRAGMA table_info(nlq_embeddings);")]
+        if "last_used" not in cols:     # older layout
+            self._conn.execute("ALTER TABLE nlq_embeddings ADD COLUMN last_used REAL;")
+            self._conn.execute("UPDATE nlq_embeddings SET last_used = created_at;")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_nlq_embeddings_last_used ON nlq_embeddings(last_used);")
+        self._conn.commit()
+
+        # In-memory index for the active fingerprint
+        self._fp = None
+        self._questions = []
+        self._sql = []
+        self._created = np.empty(0)
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+
+    def _embed(self, text):
+        vec = self.encoder.encode([normalize_question(text)], normalize_embeddings=True)[0]
+        return np.asarray(vec, dtype=np.float32)
+
+    def _load_index(self, fp):
+        if fp == self._fp:
+            return
+        # Schema/prompt changed: drop stale rows and rebuild the matrix
+        self._conn.execute("DELETE FROM nlq_embeddings WHERE fingerprint != ?;", (fp,))
+        self._conn.commit()
+        rows = self._conn.execute(
+            "SELECT question, embedding, sql, created_at FROM nlq_embeddings WHERE fingerprint = ?;",
+            (fp,)).fetchall()
+        self._fp = fp
+        self._questions = [r[0] for r in rows]
+        self._sql = [r[2] for r in rows]
+        self._created = np.array([r[3] for r in rows], dtype=np.float64)
+        if rows:
+            self._vectors = np.vstack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+        else:
+            self._vectors = np.empty((0, 0), dtype=np.float32)
+
+    def lookup(self, question, fp):
+        vec = self._embed(question)
+        now = time.time()
+        with self._lock:
+            self._load_index(fp)
+            if len(self._questions) == 0:
+                self.misses += 1
+                return None
+            scores = self._vectors @ vec
+            scores[now - self._created > self.ttl_seconds] = -1.0     # expired, not yet evicted
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE nlq_embeddings SET last_used = ? WHERE question = ? AND fingerprint = ?;",
+                (now, self._questions[best], fp))
+            self._conn.commit()
+            self.hits += 1
+            return {"sql": self._sql[best], "matched": self._questions[best], "score": float(scores[best])}
+
+    def add(self, question, fp, sql, gen_seconds=None):
+        vec = self._embed(question)
+        key = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            self._load_index(fp)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO nlq_embeddings VALUES (?, ?, ?, ?, ?, ?);",
+                (key, fp, vec.tobytes(), sql, now, now))
+            evicted = self._evict(now)
+            self._conn.commit()
+            if evicted:
+                self._fp = None
+                self._load_index(fp)
+            elif key in self._questions:
+                i = self._questions.index(key)
+                self._sql[i] = sql
+                self._created[i] = now
+                self._vectors[i] = vec
+            else:
+                self._questions.append(key)
+                self._sql.append(sql)
+                self._created = np.append(self._created, now)
+                self._vectors = vec[None, :] if self._vectors.size == 0 else np.vstack([self._vectors, vec])
+            if gen_seconds is not None:
+                self.gen_seconds += gen_seconds
+                self.gen_count += 1
+
+    def _evict(self, now):
+        # Same policy as NLQCache._evict (other fingerprints are dropped by
+        # _load_index); returns True if any row was removed
+        before = self._conn.total_changes
+        self._conn.execute("DELETE FROM nlq_embeddings WHERE created_at < ?;", (now - self.ttl_seconds,))
+        self._conn.execute("""
+            DELETE FROM nlq_embeddings WHERE rowid NOT IN (
+                SELECT rowid FROM nlq_embeddings ORDER BY last_used DESC LIMIT ?
+            );
+        """, (self.max_entries,))
+        return self._conn.total_changes > before
+
+    def stats(self):
+        avg_gen = self.gen_seconds / self.gen_count if self.gen_count else 0.0
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "est_seconds_saved": self.hits * avg_gen,
+        }
@@ -1,6 +1,8 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
+from db_pool import ReadOnlyPool
+from exporter import st_export
+from text_search import build_filters, fts_columns
 
 # Path to your SQLite database
 DB_PATH = "db/master.db"
@@ -8,44 +10,54 @@ DB_PATH = "db/master.db"
 st.set_page_config(page_title="📊 DB Inspector", layout="wide")
 st.title("📋 SQLite Database Inspector")
 
-# Connect to the database
-conn = sqlite3.connect(DB_PATH)
-
-# Get all table names
-tables = pd.read_sql("SELECT name FROM sqlite_master WHERE type='table';", conn)["name"].tolist()
-
-if not tables:
-    st.warning("No tables found in the database.")
-    st.stop()
-
-# Sidebar: select a table
-table = st.sidebar.selectbox("📁 Select a table", tables)
-
-# Display table schema
-st.subheader(f"📘 Schema for `{table}`")
-schema_df = pd.read_sql(f"PRAGMA table_info({table});", conn)
-schema_df = schema_df.rename(columns={
-    "cid": "Column ID", "name": "Column Name", "type": "Type", "notnull": "Not Null", "dflt_value": "Default", "pk": "Primary Key"
-})
-st.dataframe(schema_df, use_container_width=True)
-
-# Show preview data
-st.subheader(f"🔍 Preview data from `{table}`")
-num_rows = st.slider("Number of rows to preview", 5, 100, 10)
-df = pd.read_sql_query(f"SELECT * FROM {table} LIMIT {num_rows};", conn)
-st.dataframe(df, use_container_width=True)
-
-# Optional: search/filter
-if not df.empty:
+# Read-only connection pool, shared by all sessions
+@st.cache_resource
+def get_db_pool():
+    return ReadOnlyPool(DB_PATH)
+
+# One pooled connection is checked out for this run and returned when the
+# script finishes (or stops early)
+with get_db_pool().connection() as conn:
+    # Get all table names
+    tables = pd.read_sql("SELECT name FROM sqlite_master WHERE type='table';", conn)["name"].tolist()
+
+    if not tables:
+        st.warning("No tables found in the database.")
+        st.stop()
+
+    # Sidebar: select a table
+    table = st.sidebar.selectbox("📁 Select a table", tables)
+
+    # Display table schema
+    st.subheader(f"📘 Schema for `{table}`")
+    schema_df = pd.read_sql(f"PRAGMA table_info({table});", conn)
+    schema_df = schema_df.rename(columns={
+        "cid": "Column ID", "name": "Column Name", "type": "Type", "notnull": "Not Null", "dflt_value": "Default", "pk": "Primary Key"
+    })
+    st.dataframe(schema_df, use_container_width=True)
+
+    # Search/filter: pushed down into SQL so it covers the whole table
     st.markdown("### 🔎 Filter/Search")
-    for col in df.columns:
-        if df[col].dtype == "object":
-            search_val = st.text_input(f"Search `{col}`", key=col)
-            if search_val:
-                df = df[df[col].astype(str).str.contains(search_val, case=False, na=False)]
-                st.dataframe(df, use_container_width=True)
-
-# Download button
-st.download_button("📤 Download table as CSV", df.to_csv(index=False), file_name=f"{table}.csv")
-
-conn.close()
+    text_cols = [c["Column Name"] for _, c in schema_df.iterrows()
+                 if not c["Type"] or "CHAR" in c["Type"].upper() or "TEXT" in c["Type"].upper()]
+    indexed = set(fts_columns(conn, table))
+    filters = {}
+    search_cols = st.columns(min(len(text_cols), 3) or 1)
+    for i, col in enumerate(text_cols):
+        label = f"Search `{col}`" + (" ⚡" if col in indexed else "")
+        filters[col] = search_cols[i % len(search_cols)].text_input(label, key=f"{table}.{col}")
+    where, params = build_filters(conn, table, filters)
+    if indexed:
+        st.caption("⚡ = full-text indexed (FTS5) column")
+
+    # Show preview data
+    st.subheader(f"🔍 Preview data from `{table}`")
+    num_rows = st.slider("Number of rows to preview", 5, 100, 10)
+    df = pd.read_sql_query(f"SELECT * FROM {table}{where} LIMIT ?;", conn, params=params + [num_rows])
+    total_rows = conn.execute(f"SELECT COUNT(*) FROM {table}{where};", params).fetchone()[0]
+    st.caption(f"{total_rows:,} matching rows" if where else f"{total_rows:,} rows")
+    st.dataframe(df, use_container_width=True)
+
+    # Export: streams every matching row to disk in chunks
+    st.markdown("### 📤 Export")
+    st_export(conn, f"SELECT * FROM {table}{where}", table, key="inspect", params=params, total=total_rows)
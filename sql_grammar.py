@@ -0,0 +1,96 @@
+import os
+import re
+
+from sqltext import parse_aliases
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SQLite SELECT Grammar for Constrained Decoding
+# ─────────────────────────────────────────────────────────────────────────────
+# Builds a GBNF grammar (the format shared by llama.cpp and transformers-cfg)
+# for a practical SQLite SELECT subset whose qualified identifiers are limited
+# to the live tables/columns. Qualifiers are the aliases mandated by the prompt
+# rules ("staff as s" → s.<staff column>) or the bare table names, so the model
+# cannot emit e.g. s.staff_name when the column is s.stf_name.
+#
+# Unqualified identifiers stay free-form because output aliases
+# (AS total_requests) are legitimately referenced in ORDER BY / HAVING and a
+# context-free grammar cannot track which aliases were declared.
+CONSTRAINED = os.environ.get("SQLGEN_CONSTRAINED", "0") == "1"
+
+KEYWORDS = ["SELECT", "DISTINCT", "FROM", "WHERE", "GROUP", "BY", "HAVING", "ORDER", "LIMIT", "OFFSET",
+            "AS", "ON", "JOIN", "LEFT", "INNER", "CROSS", "OUTER", "AND", "OR", "NOT", "IN", "IS", "NULL",
+            "LIKE", "BETWEEN", "ASC", "DESC", "CASE", "WHEN", "THEN", "ELSE", "END", "CAST", "UNION", "ALL"]
+
+FUNCTIONS = ["COUNT", "SUM", "AVG", "MIN", "MAX", "ROUND", "ABS", "LOWER", "UPPER", "LENGTH", "SUBSTR", "TRIM",
+             "COALESCE", "IFNULL", "NULLIF", "strftime", "date", "time", "datetime", "julianday"]
+
+TYPES = ["INTEGER", "REAL", "TEXT", "NUMERIC", "FLOAT", "DATE"]
+
+RULES = r'''
+root ::= [ \n]* "```sql\n" query ws? ";" [ \n]* "```"
+query ::= select (ws kw-union (ws kw-all)? ws select)*
+select ::= kw-select ws (kw-distinct ws)? select-list ws from-clause (ws where-clause)? (ws group-clause)? (ws having-clause)? (ws order-clause)? (ws limit-clause)?
+select-list ::= select-item (ws? "," ws? select-item)*
+select-item ::= ("*" | expr) (ws kw-as ws ident)?
+from-clause ::= kw-from ws table-ref (ws join-clause)*
+join-clause ::= (kw-left ws (kw-outer ws)? | kw-inner ws | kw-cross ws)? kw-join ws table-ref (ws kw-on ws expr)?
+where-clause ::= kw-where ws expr
+group-clause ::= kw-group ws kw-by ws expr (ws? "," ws? expr)*
+having-clause ::= kw-having ws expr
+order-clause ::= kw-order ws kw-by ws order-item (ws? "," ws? order-item)*
+order-item ::= expr (ws (kw-asc | kw-desc))?
+limit-clause ::= kw-limit ws number (ws kw-offset ws number)?
+expr ::= unary (binop unary)*
+binop ::= ws? ("=" | "!=" | "<>" | "<=" | ">=" | "<" | ">" | "+" | "-" | "*" | "/" | "||") ws? | ws (kw-and | kw-or) ws
+unary ::= (kw-not ws | "-")? operand postfix*
+postfix ::= ws kw-is ws (kw-not ws)? kw-null | ws (kw-not ws)? kw-like ws operand | ws (kw-not ws)? kw-in ws? "(" ws? (query | expr (ws? "," ws? expr)*) ws? ")" | ws (kw-not ws)? kw-between ws operand ws kw-and ws operand
+operand ::= func-call | cast-expr | case-expr | column-ref | literal | "(" ws? (query | expr) ws? ")"
+func-call ::= func-name ws? "(" ws? ((kw-distinct ws)? ("*" | expr (ws? "," ws? expr)*))? ws? ")"
+cast-expr ::= kw-cast ws? "(" ws? expr ws kw-as ws type-name ws? ")"
+case-expr ::= kw-case (ws expr)? (ws kw-when ws expr ws kw-then ws expr)+ (ws kw-else ws expr)? ws kw-end
+column-ref ::= qualified-column | ident
+literal ::= number | string | kw-null
+number ::= [0-9]+ ("." [0-9]+)?
+string ::= "'" ([^'] | "''")* "'"
+ident ::= [a-zA-Z_] [a-zA-Z0-9_]*
+ws ::= [ \t\n]+
+'''
+
+
+def _lit(text):
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _alt(options):
+    return " | ".join(_lit(o) for o in options)
+
+
+def _rule_name(prefix, name):
+    return prefix + "-" + re.sub(r"[^a-zA-Z0-9]+", "-", name).strip("-").lower()
+
+
+def build_sqlite_grammar(columns, prompt_template):
+    aliases = parse_aliases(prompt_template)
+    lines = [RULES.strip()]
+
+    for kw in KEYWORDS:
+        lines.append(f"kw-{kw.lower()} ::= {_alt(sorted({kw, kw.lower()}))}")
+    funcs = sorted({f for name in FUNCTIONS for f in (name, name.upper(), name.lower())})
+    lines.append(f"func-name ::= {_alt(funcs)}")
+    lines.append(f"type-name ::= {_alt(TYPES)}")
+
+    table_refs, qualified = [], []
+    for table, cols in columns.items():
+        col_rule = _rule_name("col", table)
+        lines.append(f"{col_rule} ::= {_alt(cols)}")
+        qualifiers = [table] + ([aliases[table]] if table in aliases else [])
+        for q in qualifiers:
+            qualified.append(f'{_lit(q + ".")} {col_rule}')
+        if table in aliases:
+            table_refs.append(f'{_lit(table)} (ws (kw-as ws)? {_lit(aliases[table])})?')
+        else:
+            table_refs.append(_lit(table))
+
+    lines.append("table-ref ::= " + " | ".join(f"({t})" for t in table_refs))
+    lines.append("qualified-column ::= " + " | ".join(f"({q})" for q in qualified))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,286 @@
+import os
+import time
+import copy
+import queue
+from functools import lru_cache
+from threading import Event, Thread
+import torch
+from transformers import (AutoTokenizer, AutoModelForCausalLM, DynamicCache, LogitsProcessorList,
+                          TextIteratorStreamer, StoppingCriteria, StoppingCriteriaList)
+
+from sqltext import (MODEL_NAME, PROMPT_PATH, DB_PATH, MAX_NEW_TOKENS, SCHEMA_FORMAT, SCHEMA_FORMATS,
+                     load_prompt_template, get_schema, get_schema_columns, count_tokens, split_prompt,
+                     extract_sql_from_output, apply_sql_fixes, sql_statement_complete)
+
+# Speculative decoding: off | ngram (prompt-lookup drafts copied from the
+# schema/rules text) | draft (small assistant model, SQLGEN_DRAFT_MODEL)
+SPECULATIVE = os.environ.get("SQLGEN_SPECULATIVE", "off")
+DRAFT_MODEL = os.environ.get("SQLGEN_DRAFT_MODEL", "TinyLlama/TinyLlama_v1.1")
+PROMPT_LOOKUP_TOKENS = int(os.environ.get("SQLGEN_PROMPT_LOOKUP_TOKENS", "10"))
+# stream() gives up when no new text arrives for this long
+STREAM_TIMEOUT_S = float(os.environ.get("SQLGEN_STREAM_TIMEOUT_S", "120"))
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Model Loading (transformers engine; prompt/SQL text helpers live in sqltext.py)
+# ─────────────────────────────────────────────────────────────────────────────
+def load_model():
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModelForCausalLM.from_pretrained(
+        MODEL_NAME,
+        torch_dtype=torch.float16,
+        device_map="auto"
+    )
+    return tokenizer, model
+
+
+@lru_cache(maxsize=None)
+def load_draft_model(name=DRAFT_MODEL):
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    model = AutoModelForCausalLM.from_pretrained(
+        name,
+        torch_dtype=torch.float16,
+        device_map="auto"
+    )
+    return tokenizer, model
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Early Stop Once the SQL Is Complete
+# ─────────────────────────────────────────────────────────────────────────────
+class SQLStopCriteria(StoppingCriteria):
+    # Per-row stop flags so batched generation also ends rows independently;
+    # `generated` keeps the new-token count at the last step for savings stats
+    def __init__(self, tokenizer, prompt_len):
+        self.tokenizer = tokenizer
+        self.prompt_len = prompt_len
+        self.generated = 0
+
+    def __call__(self, input_ids, scores, **kwargs):
+        self.generated = input_ids.shape[1] - self.prompt_len
+        done = [sql_statement_complete(self.tokenizer.decode(row[self.prompt_len:], skip_special_tokens=True))
+                for row in input_ids]
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+
+class CancelCriteria(StoppingCriteria):
+    # Ends generation at the next step once the event is set
+    def __init__(self, event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SQL Generator (static prefix KV-cache + single/batched generation)
+# ─────────────────────────────────────────────────────────────────────────────
+class SQLGenerator:
+    def __init__(self, tokenizer, model, prompt_template, schema_text, speculative=SPECULATIVE, draft=None,
+                 grammar=None):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.speculative = speculative
+        self.draft = draft
+        self.grammar_constraint = None
+        if grammar is not None:
+            # Optional dependency: pip install transformers-cfg
+            from transformers_cfg.grammar_utils import IncrementalGrammarConstraint
+            self.grammar_constraint = IncrementalGrammarConstraint(grammar, "root", tokenizer)
+        self.prompt_prefix, self.prompt_suffix = split_prompt(prompt_template, schema_text)
+        self.pad_token_id = tokenizer.pad_token_id or tokenizer.eos_token_id
+
+        # Prefill the schema/rules prefix once; generate() only prefills the question
+        self.prefix_ids = tokenizer(self.prompt_prefix, return_tensors="pt").input_ids.to(model.device)
+        with torch.no_grad():
+            self.prefix_kv = model(input_ids=self.prefix_ids, past_key_values=DynamicCache(),
+                                   use_cache=True).past_key_values
+
+    def build_prompt(self, nlq):
+        return self.prompt_prefix + self.prompt_suffix.format(question=nlq)
+
+    def _suffix_ids(self, nlq):
+        return self.tokenizer(self.prompt_suffix.format(question=nlq),
+                              add_special_tokens=False).input_ids
+
+    def _input_ids(self, nlq):
+        suffix_ids = torch.tensor([self._suffix_ids(nlq)], device=self.model.device)
+        return torch.cat([self.prefix_ids, suffix_ids], dim=-1)
+
+    def _speculative_kwargs(self):
+        # Assisted generation is single-sequence only, so generate_batch() never uses it
+        if self.speculative == "ngram":
+            return {"prompt_lookup_num_tokens": PROMPT_LOOKUP_TOKENS}
+        if self.speculative == "draft":
+            draft_tokenizer, draft_model = self.draft or load_draft_model()
+            kwargs = {"assistant_model": draft_model}
+            if draft_tokenizer.get_vocab() != self.tokenizer.get_vocab():
+                # Universal assisted decoding re-tokenizes drafts across vocabularies
+                kwargs.update(tokenizer=self.tokenizer, assistant_tokenizer=draft_tokenizer)
+            return kwargs
+        return {}
+
+    def _constraint_kwargs(self):
+        # A fresh processor per call: it tracks parser state from the first
+        # (prompt) step onwards, so only generated tokens are constrained
+        if self.grammar_constraint is None:
+            return {}
+        from transformers_cfg.generation.logits_process import GrammarConstrainedLogitsProcessor
+        return {"logits_processor": LogitsProcessorList([GrammarConstrainedLogitsProcessor(self.grammar_constraint)])}
+
+    @staticmethod
+    def _record_savings(stats, new_tokens, max_new_tokens):
+        # Per-call stats go into the caller's dict: one generator is shared
+        # by every session, so nothing per-call is kept on the instance
+        if stats is not None:
+            stats.update(new_tokens=new_tokens, tokens_saved=max_new_tokens - new_tokens)
+
+    def generate(self, nlq, max_new_tokens=MAX_NEW_TOKENS, stats=None):
+        input_ids = self._input_ids(nlq)
+        stop = SQLStopCriteria(self.tokenizer, input_ids.shape[1])
+        outputs = self.model.generate(
+            input_ids=input_ids,
+            attention_mask=torch.ones_like(input_ids),
+            past_key_values=copy.deepcopy(self.prefix_kv),   # generate() extends the cache in place
+            max_new_tokens=max_new_tokens,
+            temperature=0.7,
+            top_p=0.9,
+            pad_token_id=self.pad_token_id,
+            stopping_criteria=StoppingCriteriaList([stop]),
+            **self._speculative_kwargs(),
+            **self._constraint_kwargs(),
+        )
+        self._record_savings(stats, stop.generated, max_new_tokens)
+        return self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+
+    def stream(self, nlq, max_new_tokens=MAX_NEW_TOKENS, stats=None):
+        # Yields generated text chunks as they are decoded; generation runs in a
+        # background thread and stops early once the statement is complete.
+        # A consumer that stops iterating (or a stalled stream) cancels the
+        # decode, and an exception in the thread is re-raised here.
+        input_ids = self._input_ids(nlq)
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True,
+                                        timeout=STREAM_TIMEOUT_S)
+        stop = SQLStopCriteria(self.tokenizer, input_ids.shape[1])
+        cancel = Event()
+        errors = []
+
+        def run(**kwargs):
+            try:
+                self.model.generate(**kwargs)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()      # unblock the consumer
+
+        thread = Thread(target=run, daemon=True, kwargs=dict(
+            input_ids=input_ids,
+            attention_mask=torch.ones_like(input_ids),
+            past_key_values=copy.deepcopy(self.prefix_kv),
+            max_new_tokens=max_new_tokens,
+            temperature=0.7,
+            top_p=0.9,
+            pad_token_id=self.pad_token_id,
+            streamer=streamer,
+            stopping_criteria=StoppingCriteriaList([stop, CancelCriteria(cancel)]),
+            **self._speculative_kwargs(),
+            **self._constraint_kwargs(),
+        ))
+        thread.start()
+        try:
+            for text in streamer:
+                yield text
+        except queue.Empty:
+            raise TimeoutError(f"No output from the model for {STREAM_TIMEOUT_S:g} s") from None
+        finally:
+            cancel.set()
+            thread.join(timeout=STREAM_TIMEOUT_S)
+        if errors:
+            raise errors[0]
+        self._record_savings(stats, stop.generated, max_new_tokens)
+
+    def nl_to_sql(self, nlq, max_new_tokens=MAX_NEW_TOKENS, stats=None):
+        raw = self.generate(nlq, max_new_tokens=max_new_tokens, stats=stats)
+        return raw, apply_sql_fixes(extract_sql_from_output(raw))
+
+    def _plan_batches(self, lengths, max_batch_size, token_budget, max_new_tokens):
+        # Sort by length so padding is minimal, then grow each batch until the
+        # KV footprint (rows × (prefix + longest suffix + new tokens)) hits the budget
+        prefix_len = self.prefix_ids.shape[1]
+        batches, current = [], []
+        for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+            row_tokens = prefix_len + lengths[i] + max_new_tokens
+            if current and (len(current) + 1 > max_batch_size or (len(current) + 1) * row_tokens > token_budget):
+                batches.append(current)
+                current = []
+            current.append(i)
+        if current:
+            batches.append(current)
+        return batches
+
+    def generate_batch(self, questions, max_new_tokens=MAX_NEW_TOKENS):
+        # Left-pad each question suffix; padding sits between the shared prefix
+        # and the question and is masked out (position ids follow the mask)
+        encoded = [self._suffix_ids(q) for q in questions]
+        width = max(len(e) for e in encoded)
+        n = len(questions)
+        suffix_ids = torch.tensor([[self.pad_token_id] * (width - len(e)) + e for e in encoded])
+        suffix_mask = torch.tensor([[0] * (width - len(e)) + [1] * len(e) for e in encoded])
+
+        device = self.model.device
+        input_ids = torch.cat([self.prefix_ids.expand(n, -1), suffix_ids.to(device)], dim=-1)
+        attention_mask = torch.cat([torch.ones(n, self.prefix_ids.shape[1], dtype=torch.long, device=device),
+                                    suffix_mask.to(device)], dim=-1)
+        past_key_values = copy.deepcopy(self.prefix_kv)
+        past_key_values.batch_repeat_interleave(n)
+        stop = SQLStopCriteria(self.tokenizer, input_ids.shape[1])
+
+        outputs = self.model.generate(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            past_key_values=past_key_values,
+            max_new_tokens=max_new_tokens,
+            temperature=0.7,
+            top_p=0.9,
+            pad_token_id=self.pad_token_id,
+            stopping_criteria=StoppingCriteriaList([stop]),
+            **self._constraint_kwargs(),
+        )
+        # Rows stopped early are padded up to the longest row, so savings are
+        # counted per row from the non-pad token count
+        new_tokens = int((outputs[:, input_ids.shape[1]:] != self.pad_token_id).sum())
+        raws = [self.tokenizer.decode(row, skip_special_tokens=True) for row in outputs]
+        completions = [self.tokenizer.decode(row[input_ids.shape[1]:], skip_special_tokens=True) for row in outputs]
+        return raws, completions, new_tokens
+
+    def nl_to_sql_batch(self, questions, max_batch_size=8, token_budget=32768, max_new_tokens=MAX_NEW_TOKENS,
+                        batch_stats=None):
+        # batch_stats: optional list that receives one stats dict per batch
+        lengths = [len(self._suffix_ids(q)) for q in questions]
+        results = [None] * len(questions)
+        batch_stats = [] if batch_stats is None else batch_stats
+
+        for b, batch in enumerate(self._plan_batches(lengths, max_batch_size, token_budget, max_new_tokens)):
+            start = time.time()
+            raws, completions, new_tokens = self.generate_batch([questions[i] for i in batch],
+                                                                max_new_tokens=max_new_tokens)
+            elapsed = time.time() - start
+
+            for i, raw, completion in zip(batch, raws, completions):
+                results[i] = {
+                    "question": questions[i],
+                    "raw": raw,
+                    "completion": completion,
+                    "sql": apply_sql_fixes(extract_sql_from_output(raw)),
+                }
+
+            stats = {
+                "batch": b,
+                "size": len(batch),
+                "seconds": elapsed,
+                "questions_per_s": len(batch) / elapsed,
+                "tokens_per_s": new_tokens / elapsed,
+                "tokens_saved": len(batch) * max_new_tokens - new_tokens,
+            }
+            batch_stats.append(stats)
+            print(f"📦 Batch {b}: {len(batch)} questions in {elapsed:.2f} s "
+                  f"→ {stats['questions_per_s']:.2f} q/s, {stats['tokens_per_s']:.1f} tok/s, "
+                  f"{stats['tokens_saved']} tokens saved by early stop")
+
+        return results
@@ -0,0 +1,249 @@
+import os
+import re
+import pandas as pd
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Prompt, schema and SQL text helpers (no torch/transformers imports, so thin
+# clients and the UI can use them without loading the model stack)
+# ─────────────────────────────────────────────────────────────────────────────
+MODEL_NAME = "defog/sqlcoder-7b-2"
+PROMPT_PATH = "prompt/prompt.txt"
+DB_PATH = "db/master.db"
+MAX_NEW_TOKENS = 256
+
+# How get_schema() renders tables for the prompt (SQLGEN_SCHEMA_FORMAT):
+#   markdown – one table per block with | Column | Type | rows (original format)
+#   ddl      – one compact CREATE TABLE per line with PRIMARY KEY / REFERENCES
+#   compact  – "table: col TYPE, col TYPE, ..." one line per table
+SCHEMA_FORMAT = os.environ.get("SQLGEN_SCHEMA_FORMAT", "markdown")
+SCHEMA_FORMATS = ["markdown", "ddl", "compact"]
+
+# Bookkeeping tables written by the ETL; never shown to the model
+INTERNAL_TABLES = ("table_versions", "rollup_state")
+FTS_TABLE_RE = re.compile(r"_fts(_(data|idx|docsize|config|content))?$")   # FTS5 index + shadow tables
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Prompt and Schema Loading
+# ─────────────────────────────────────────────────────────────────────────────
+def load_prompt_template(path=PROMPT_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def list_tables(conn):
+    tables = [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';")]
+    return [t for t in tables if t not in INTERNAL_TABLES and not FTS_TABLE_RE.search(t)]
+
+
+def get_schema(conn, tables=None, fmt=SCHEMA_FORMAT):
+    # tables: optional subset (e.g. from SchemaLinker) to render instead of all tables
+    if tables is None:
+        tables = list_tables(conn)
+    if fmt == "ddl":
+        return get_schema_ddl(conn, tables)
+    if fmt == "compact":
+        return get_schema_compact(conn, tables)
+    if fmt != "markdown":
+        raise ValueError(f"Unknown schema format '{fmt}', expected one of {SCHEMA_FORMATS}")
+
+    schema_md = ""
+    for table in tables:
+        cols = pd.read_sql(f"PRAGMA table_info({table});", conn)
+        schema_md += f"### Table `{table}`\n"
+        schema_md += "| Column | Type |\n|--------|------|\n"
+        for _, col in cols.iterrows():
+            schema_md += f"| `{col['name']}` | `{col['type']}` |\n"
+        schema_md += "\n"
+    return schema_md
+
+
+def get_schema_ddl(conn, tables):
+    lines = []
+    for table in tables:
+        refs = {fk[3]: f"{fk[2]}({fk[4]})" for fk in conn.execute(f"PRAGMA foreign_key_list({table});")}
+        cols = []
+        for _, name, col_type, _, _, pk in conn.execute(f"PRAGMA table_info({table});"):
+            col = f"{name} {col_type}".strip()
+            if pk:
+                col += " PRIMARY KEY"
+            if name in refs:
+                col += f" REFERENCES {refs[name]}"
+            cols.append(col)
+        lines.append(f"CREATE TABLE {table} ({', '.join(cols)});")
+    return "\n".join(lines) + "\n"
+
+
+def get_schema_compact(conn, tables):
+    lines = []
+    for table in tables:
+        cols = [f"{c[1]} {c[2]}".strip() for c in conn.execute(f"PRAGMA table_info({table});")]
+        lines.append(f"{table}: {', '.join(cols)}")
+    return "\n".join(lines) + "\n"
+
+
+def count_tokens(text, tokenizer=None):
+    # Exact with a HF tokenizer; otherwise a rough word/punctuation count
+    # that is close enough to compare schema formats in the UI
+    if tokenizer is not None:
+        return len(tokenizer(text, add_special_tokens=False).input_ids)
+    return len(re.findall(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]", text))
+
+
+def get_schema_columns(conn):
+    # {table: [columns]} for the same tables get_schema() shows the model
+    tables = list_tables(conn)
+    return {t: [c[1] for c in conn.execute(f"PRAGMA table_info({t});")] for t in tables}
+
+
+def parse_aliases(prompt_template):
+    # "  - staff as s" lines from the ### Rules block
+    return {t: a for t, a in re.findall(r"^\s*-\s*(\w+)\s+as\s+(\w+)\s*$", prompt_template, re.MULTILINE)}
+
+
+def table_aliases(sql):
+    # {alias or table name: table} from FROM / JOIN clauses, including
+    # comma-separated FROM lists ("FROM a x, b y"), but not the
+    # "FROM c.start_time" inside EXTRACT
+    item = r"(\w+)\b(?!\.)(?:\s+(?:AS\s+)?(\w+))?"
+    aliases = {}
+    for m in re.finditer(rf"\b(?:FROM|JOIN)\s+{item}((?:\s*,\s*{item})*)", sql, re.IGNORECASE):
+        for table, alias in [(m.group(1), m.group(2))] + re.findall(rf"\s*,\s*{item}", m.group(3)):
+            aliases[table] = table
+            if alias and alias.upper() not in ("ON", "WHERE", "JOIN", "LEFT", "INNER", "CROSS", "GROUP",
+                                               "ORDER", "LIMIT", "USING", "NATURAL", "UNION", "HAVING"):
+                aliases[alias] = table
+    return aliases
+
+
+def split_prompt(prompt_template, schema_text):
+    # Static prefix = everything before the first {question}; a {schema} that
+    # only appears after it is baked into the suffix (braces escaped for format)
+    prefix, suffix = prompt_template.split("{question}", 1)
+    escaped_schema = schema_text.replace("{", "{{").replace("}", "}}")
+    return prefix.format(schema=schema_text), "{question}" + suffix.replace("{schema}", escaped_schema)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SQL Extraction Helper
+# ─────────────────────────────────────────────────────────────────────────────
+def extract_sql_from_output(output):
+    match = re.search(r"```sql\n(.*?)```", output, re.DOTALL | re.IGNORECASE)
+    if match:
+        return match.group(1).strip()
+    match = re.search(r"(SELECT .*?;)", output, re.DOTALL | re.IGNORECASE)
+    if match:
+        return match.group(1).strip()
+    return output.strip().split("\n")[-1].strip()
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SQL Fix Layer for SQLite Compatibility
+# ─────────────────────────────────────────────────────────────────────────────
+def apply_sql_fixes(sql, fts=None, columns=None):
+    # fts: optional {table: [columns]} of FTS5 trigram indexes present in the
+    # database (see text_search.fts_columns); enables the LIKE → MATCH rewrite
+    # columns: optional {table: [columns]} (get_schema_columns); enables the
+    # rewrite of timestamp parsing onto the ETL's pre-parsed columns
+    # Fix ILIKE and LIKE
+    sql = re.sub(r"(\b\w+\.\w+)\s+ILIKE\s+'([^']*)'", lambda m: f"LOWER({m.group(1)}) LIKE LOWER('%{m.group(2)}%')", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"(\b\w+\.\w+)\s+LIKE\s+'([^']*)'", lambda m: f"LOWER({m.group(1)}) LIKE LOWER('%{m.group(2)}%')", sql, flags=re.IGNORECASE)
+
+    if columns:
+        sql = rewrite_time_parsing(sql, columns)
+
+    # Replace EXTRACT with strftime (Month)
+    sql = re.sub(r"EXTRACT\s*\(\s*MONTH\s+FROM\s+([^)]+?)\s*\)", r"CAST(strftime('%m', \1) AS INTEGER)", sql)
+    sql = re.sub(r"EXTRACT\s*\(\s*YEAR\s+FROM\s+([^)]+?)\s*\)", r"CAST(strftime('%Y', \1) AS INTEGER)", sql)
+
+    # Remove PostgreSQL-style casts ::DATE
+    sql = re.sub(r"::\s*DATE", "", sql)
+
+    # Optional: Remove double-quoted column names if any
+    sql = sql.replace('"', '')
+
+    if fts:
+        sql = rewrite_like_to_fts(sql, fts)
+
+    return sql
+
+
+TIME_PARTS = {"YEAR": "year", "MONTH": "month", "DAY": "day", "HOUR": "hour",
+              "%Y": "year", "%m": "month", "%d": "day", "%H": "hour", "%s": "epoch"}
+
+
+def rewrite_time_parsing(sql, columns):
+    # The ETL stores every <x>_time text timestamp also as <x>_epoch (integer
+    # seconds) and, for the main event times, <x>_year/_month/_day/_hour, all
+    # indexed. Parsing the text per row is rewritten onto those columns:
+    #   EXTRACT(MONTH FROM c.start_time)                 → c.start_month
+    #   CAST(strftime('%H', r.created_time) AS INTEGER)  → r.created_hour
+    #   CAST(strftime('%s', c.start_time) AS INTEGER)    → c.start_epoch
+    #   julianday(c.complete_time) - julianday(c.start_time)
+    #                              → (c.complete_epoch - c.start_epoch) / 86400.0
+    # Bare strftime() calls are left alone: they return text ('08'), which
+    # the query may compare as text.
+    aliases = table_aliases(sql)
+
+    def derived(alias, column, part):
+        table = aliases.get(alias)
+        if not column.endswith("_time") or table not in columns:
+            return None
+        name = f"{column[:-len('_time')]}_{part}"
+        return f"{alias}.{name}" if name in columns[table] else None
+
+    def extract(m):
+        return derived(m.group(2), m.group(3), TIME_PARTS[m.group(1).upper()]) or m.group(0)
+
+    def cast_strftime(m):
+        return derived(m.group(2), m.group(3), TIME_PARTS[m.group(1)]) or m.group(0)
+
+    def day_diff(m):
+        end, start = derived(m.group(1), m.group(2), "epoch"), derived(m.group(3), m.group(4), "epoch")
+        return f"({end} - {start}) / 86400.0" if end and start else m.group(0)
+
+    sql = re.sub(r"EXTRACT\s*\(\s*(YEAR|MONTH|DAY|HOUR)\s+FROM\s+(\w+)\.(\w+)\s*\)", extract, sql, flags=re.IGNORECASE)
+    sql = re.sub(r"CAST\s*\(\s*strftime\s*\(\s*'(%[YmdHs])'\s*,\s*(\w+)\.(\w+)\s*\)\s+AS\s+INTEGER\s*\)",
+                 cast_strftime, sql, flags=re.IGNORECASE)
+    return re.sub(r"julianday\s*\(\s*(\w+)\.(\w+)\s*\)\s*-\s*julianday\s*\(\s*(\w+)\.(\w+)\s*\)",
+                  day_diff, sql, flags=re.IGNORECASE)
+
+
+def rewrite_like_to_fts(sql, fts):
+    # LOWER(r.remarks) LIKE LOWER('%aircon%') (what the LIKE fix above
+    # produces) scans every row; with a trigram index on <table>_fts the same
+    # case-insensitive substring test is an index lookup. Only plain terms of
+    # 3+ characters are rewritten: no inner wildcards, quotes or NOT LIKE.
+    aliases = table_aliases(sql)
+
+    def rewrite(m):
+        alias, column, term = m.group(1), m.group(2), m.group(3)
+        table = aliases.get(alias)
+        if table not in fts or column not in fts[table] or len(term) < 3:
+            return m.group(0)
+        if sql[:m.start()].rstrip().upper().endswith("NOT"):
+            return m.group(0)
+        return (f"{alias}.rowid IN (SELECT rowid FROM {table}_fts "
+                f"WHERE {table}_fts MATCH '{column} : \"{term}\"')")
+
+    return re.sub(r"LOWER\((\w+)\.(\w+)\)\s+LIKE\s+LOWER\('%+([^%_'\"]+)%+'\)", rewrite, sql, flags=re.IGNORECASE)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Early Stop Once the SQL Is Complete
+# ─────────────────────────────────────────────────────────────────────────────
+def sql_statement_complete(text):
+    # A statement is complete once its code fence closes, or once a ';' is
+    # emitted outside any string literal with all parentheses balanced
+    if text.count("```") >= 2:
+        return True
+    depth, in_string = 0, False
+    for ch in text:
+        if ch == "'":
+            in_string = not in_string      # '' escapes toggle twice, net no-op
+        elif in_string:
+            continue
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth = max(depth - 1, 0)
+        elif ch == ";" and depth == 0:
+            return True
+    return False
@@ -0,0 +1,77 @@
+import re
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Server-side Text Search (LIKE, or FTS5 where an index exists)
+# ─────────────────────────────────────────────────────────────────────────────
+# Builds parameterised WHERE clauses for per-column substring search. When the
+# ETL has built an FTS5 index "<table>_fts" (trigram tokenizer, external
+# content keyed on rowid) covering the column, terms of 3+ characters become
+# an index lookup; everything else is a case-insensitive LIKE with %/_
+# escaped, so user input is always matched literally.
+FTS_SUFFIX = "_fts"
+FTS_MIN_CHARS = 3       # trigram tokenizer cannot match shorter terms
+
+
+def fts_index_current(conn, table):
+    # The ETL records the index in table_versions with the version of the
+    # table it was built from; an index left behind by a rebuild that did not
+    # refresh it would return rows by stale rowids. Databases without
+    # table_versions are trusted as-is.
+    has_versions = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='table_versions';").fetchone()
+    if not has_versions:
+        return True
+    versions = dict(conn.execute("SELECT table_name, version FROM table_versions WHERE table_name IN (?, ?);",
+                                 (table, table + FTS_SUFFIX)).fetchall())
+    return table not in versions or versions.get(table + FTS_SUFFIX) == versions[table]
+
+
+def fts_state(conn):
+    # Token that changes whenever an FTS5 index appears or disappears or its
+    # table_versions row (or its source table's) moves; cheap enough to
+    # compute on every Streamlit rerun and key the fts_columns() lookup on
+    names = [r[0] for r in conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table';")
+             if r[0].endswith(FTS_SUFFIX) and r[1] and "using fts5" in r[1].lower()]
+    has_versions = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='table_versions';").fetchone()
+    if not names or not has_versions:
+        return repr(sorted(names))
+    tables = names + [n[:-len(FTS_SUFFIX)] for n in names]
+    versions = conn.execute(f"SELECT table_name, version FROM table_versions WHERE table_name IN "
+                            f"({', '.join('?' * len(tables))}) ORDER BY table_name;", tables).fetchall()
+    return repr(sorted(names)) + repr(versions)
+
+
+def fts_columns(conn, table):
+    # [] when there is no current FTS5 index for the table
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE name = ?;", (table + FTS_SUFFIX,)).fetchone()
+    if row is None or not row[0] or "using fts5" not in row[0].lower():
+        return []
+    if not fts_index_current(conn, table):
+        return []
+    return [c[1] for c in conn.execute(f"PRAGMA table_info({table}{FTS_SUFFIX});")]
+
+
+def like_pattern(value):
+    return "%" + re.sub(r"([\\%_])", r"\\\1", value) + "%"
+
+
+def fts_phrase(column, value):
+    return f'{column} : "' + value.replace('"', '""') + '"'
+
+
+def build_filters(conn, table, filters):
+    # filters: {column: search text}; returns (" WHERE ..." or "", params)
+    indexed = set(fts_columns(conn, table))
+    clauses, params = [], []
+    for column, value in filters.items():
+        value = value.strip()
+        if not value:
+            continue
+        if column in indexed and len(value) >= FTS_MIN_CHARS:
+            clauses.append(f"rowid IN (SELECT rowid FROM {table}{FTS_SUFFIX} WHERE {table}{FTS_SUFFIX} MATCH ?)")
+            params.append(fts_phrase(column, value))
+        else:
+            clauses.append(f"CAST({column} AS TEXT) LIKE ? ESCAPE '\\'")
+            params.append(like_pattern(value))
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params